@@ -0,0 +1,63 @@
+"""
+Account registry (accounts.json) and per-account target-slot rules for the
+async / multi-account runners.
+
+accounts.json:
+{
+  "accounts": [
+    {
+      "name": "calvin",
+      "storage_state": "calvin.json",
+      "prefer_second": false,                       # first or second occurrence
+      "release_slots": {"17": "19:00 - 20:00"}      # release hour -> slot to book
+    }
+  ]
+}
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+ACCOUNTS_FILE = "accounts.json"
+
+MTL = ZoneInfo("America/Toronto")
+GRACE_MIN = 10  # minutes after the hour to keep targeting the previous release window
+
+
+def load_accounts():
+    with open(ACCOUNTS_FILE, "r") as f:
+        return json.load(f).get("accounts", [])
+
+
+def find_account(name):
+    return next((a for a in load_accounts() if a["name"] == name), None)
+
+
+def load_priority_slots():
+    try:
+        with open("slots.json", "r") as f:
+            data = json.load(f)
+            return data.get("slots", [])
+    except Exception as e:
+        print(f"❌ Could not load slots.json: {e}")
+        return []
+
+
+def get_target_slot(account, all_slots):
+    """get_target_slot() of the final_booking scripts, driven by the account's release_slots."""
+    override = os.getenv("SLOT_TARGET")
+    if override and override in all_slots:
+        return [override]
+
+    now = datetime.now(MTL)
+    hh, mm = now.hour, now.minute
+    for release_hour, slot in account["release_slots"].items():
+        release_hour = int(release_hour)
+        if hh == release_hour - 1 or (hh == release_hour and mm <= GRACE_MIN):
+            return [slot] if slot in all_slots else []
+    return []
+
+
+def get_tomorrows_date_str():
+    return (datetime.now(MTL).date() + timedelta(days=1)).strftime("%Y-%m-%d")
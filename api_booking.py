@@ -0,0 +1,247 @@
+"""
+Direct API booking mode.
+
+The checkout normally runs through the browser: fa-plus (add_to_cart),
+u3600_btnSelect0 + u3600_btnCheckout0 (select_user), the cart completion step
+(complete_cart) and the payment conditions (payment).
+Each of those clicks fires one or more XHRs. This module records them once
+and replays them as plain HTTP calls for later bookings.
+
+Recording (API_RECORD=true): ApiRecorder listens to every XHR/fetch of a real
+browser booking, tags it with the current step and saves the request and its
+JSON response to <account>.api_template.json, together with the search
+result item that was booked.
+
+Replaying (API_BOOKING=true, needs HTTP_PROBE=true): when the probe finds a
+matching item, ApiBooker replays the template. Values that differ between
+the recorded item and the new one (row/schedule ids, ...) are substituted in
+every URL and body, and so are values that differ between each recorded
+response and the live one (cart ids, ...), so later steps use the ids the
+server just handed out. The row is claimed through the same ClaimPicker as
+the browser scans (so CLAIM_LEDGER bookers never replay the same row). If any
+step fails (an HTTP error, or a JSON body with an error field, a false
+success flag or without the recorded keys; the payment step must look like
+its recorded success), try_book() releases the claim and returns None and
+the caller falls back to the Playwright flow, first removing the item from
+the cart if the add_to_cart step already went through (discard_cart).
+"""
+import json
+import os
+import re
+
+import requests
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from checkout_pipeline import CART_URL, clear_cart
+from http_probe import _SKIP_HEADERS, _result_items, is_search_request, item_matches, session_from_storage_state
+from xhr_results import parse_item
+
+API_RECORD = os.getenv("API_RECORD", "false").lower() == "true"
+API_BOOKING = os.getenv("API_BOOKING", "false").lower() == "true"
+
+BOOKING_STEPS = ["add_to_cart", "select_user", "complete_cart", "payment"]
+
+# Top-level fields of a step response that report a failure
+_ERROR_KEY = re.compile(r"^(error|errors|errormessage|errorcode|exception|fault)$", re.IGNORECASE)
+_SUCCESS_KEY = re.compile(r"^(success|succeeded|ok|issuccess)$", re.IGNORECASE)
+_STATUS_KEY = re.compile(r"^(status|statut|state|result)$", re.IGNORECASE)
+_FAILED_STATUS = re.compile(r"error|erreur|fail|échec|echec|invalid|refus", re.IGNORECASE)
+
+
+def template_path(storage_state_path):
+    """calvin.json -> calvin.api_template.json"""
+    root, _ = os.path.splitext(storage_state_path)
+    return f"{root}.api_template.json"
+
+
+def _json_or_none(text):
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def diff_values(old, new, out=None):
+    """
+    Walk two JSON values with the same shape and map every scalar that
+    changed (as a string) to its new value.
+    """
+    out = {} if out is None else out
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old.keys() & new.keys():
+            diff_values(old[key], new[key], out)
+    elif isinstance(old, list) and isinstance(new, list):
+        for a, b in zip(old, new):
+            diff_values(a, b, out)
+    elif not isinstance(old, (dict, list, bool)) and old is not None and old != new:
+        old_text = str(old)
+        if len(old_text) >= 2 and new is not None:
+            out[old_text] = str(new)
+    return out
+
+
+def response_problem(recorded, live):
+    """Why a live step response doesn't look like the recorded (successful) one, or None if it does."""
+    if recorded is None:
+        return None
+    if live is None:
+        return "no JSON body"
+    if not isinstance(recorded, dict):
+        return None
+    if not isinstance(live, dict):
+        return "unexpected response shape"
+    for key, value in live.items():
+        if _ERROR_KEY.match(key) and value and not recorded.get(key):
+            return f"{key}: {value}"
+        if _SUCCESS_KEY.match(key) and value is False and recorded.get(key) is not False:
+            return f"{key} is false"
+        if _STATUS_KEY.match(key) and isinstance(value, str) and _FAILED_STATUS.search(value) and value != recorded.get(key):
+            return f"{key}: {value}"
+    missing = recorded.keys() - live.keys()
+    if missing:
+        return f"missing {', '.join(sorted(missing))}"
+    return None
+
+
+def substitute(text, substitutions):
+    if not text:
+        return text
+    for old, new in substitutions.items():
+        text = re.sub(rf"(?<![\w-]){re.escape(old)}(?![\w-])", lambda _: new, text)
+    return text
+
+
+class ApiRecorder:
+    """Record the XHRs of a browser booking, step by step."""
+
+    def __init__(self, storage_state_path):
+        self.path = template_path(storage_state_path)
+        self.step = "search"
+        self.responses = []  # (step, Response)
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+
+    def mark(self, step):
+        self.step = step
+
+    def _on_response(self, response):
+        request = response.request
+        if request.resource_type not in ("xhr", "fetch"):
+            return
+        # Pagination and re-searches are never part of the booking itself
+        step = "search" if is_search_request(request) else self.step
+        self.responses.append((step, response))
+
+    def save(self, booked_slot, target_date, wanted=1):
+        """Write the template; bodies are read now, after the booking went through."""
+        steps = {step: [] for step in BOOKING_STEPS}
+        booked_item = None
+        for step, response in self.responses:
+            try:
+                body = response.text()
+            except Exception:
+                body = None
+            if step == "search":
+                items = _result_items(_json_or_none(body))
+                matches = [i for i in items if item_matches(json.dumps(i, ensure_ascii=False), booked_slot, target_date)]
+                if len(matches) >= wanted:
+                    booked_item = matches[wanted - 1]
+                continue
+            request = response.request
+            steps[step].append({
+                "method": request.method,
+                "url": request.url,
+                "headers": {k: v for k, v in request.headers.items() if k.lower() not in _SKIP_HEADERS},
+                "body": request.post_data,
+                "response": _json_or_none(body),
+            })
+
+        if booked_item is None or not steps["add_to_cart"]:
+            print("⚠️ [API] Could not identify the booked row or add-to-cart call, template not saved.")
+            return False
+        with open(self.path, "w") as f:
+            json.dump({"item": booked_item, "steps": steps}, f, indent=2)
+        print(f"💾 [API] Saved booking template to {self.path}")
+        return True
+
+
+class ApiBooker:
+    """Replay a recorded booking template against a new search result item."""
+
+    def __init__(self, storage_state_path):
+        self.session = session_from_storage_state(storage_state_path)
+        with open(template_path(storage_state_path), "r") as f:
+            self.template = json.load(f)
+        self.left_in_cart = False  # a failed replay got past add_to_cart
+
+    @classmethod
+    def load(cls, storage_state_path):
+        if not os.path.exists(template_path(storage_state_path)):
+            print("⚠️ [API] No recorded booking template, API booking disabled.")
+            return None
+        return cls(storage_state_path)
+
+    def book(self, item):
+        """Run every recorded step for item. True once the payment step went through."""
+        if not self.template["steps"].get("payment"):
+            print("❌ [API] The template has no payment call, nothing would confirm the booking.")
+            return False
+        substitutions = diff_values(self.template["item"], item)
+        for step in BOOKING_STEPS:
+            for call in self.template["steps"].get(step, []):
+                try:
+                    response = self.session.request(
+                        call["method"],
+                        substitute(call["url"], substitutions),
+                        headers=call["headers"],
+                        data=substitute(call["body"], substitutions),
+                        timeout=10,
+                    )
+                except requests.RequestException as e:
+                    print(f"❌ [API] {step} failed: {e}")
+                    return False
+                if response.status_code >= 400:
+                    print(f"❌ [API] {step} returned HTTP {response.status_code}")
+                    return False
+                if step == "add_to_cart":
+                    self.left_in_cart = True  # even if the body says otherwise, the cart gets checked
+                live = _json_or_none(response.text)
+                problem = response_problem(call["response"], live)
+                if problem is None and step == "payment" and call["response"] is None:
+                    problem = "no recorded response to confirm the payment against"
+                if problem:
+                    print(f"❌ [API] {step} failed: {problem}")
+                    return False
+                if call["response"] is not None:
+                    diff_values(call["response"], live, substitutions)
+            print(f"[API] {step} done")
+        return True
+
+    def try_book(self, probe, target_date, picker):
+        """Book the row picker takes from the probe's last matches. Returns the slot or None."""
+        for slot, item in probe.last_matches:
+            row = parse_item(item)
+            if not picker.take(target_date, slot, row.facility if row else None):
+                continue
+            print(f"[API] Booking '{slot}' through direct API calls...")
+            if self.book(item):
+                print("🎉 Reservation fully confirmed through the API!")
+                return slot
+            picker.release()
+            print("↩️ [API] Falling back to the browser checkout.")
+            return None
+        return None
+
+    def discard_cart(self, page):
+        """Remove what a failed replay left in the cart, so the browser doesn't add a second row."""
+        if not self.left_in_cart:
+            return
+        print("🧹 [API] Removing the row the API replay left in the cart...")
+        page.goto(CART_URL, wait_until="domcontentloaded")
+        try:
+            page.wait_for_load_state("networkidle", timeout=10000)
+        except PlaywrightTimeoutError:
+            print("⚠️ [API] Cart did not settle, clearing it anyway.")
+        clear_cart(page)
+        self.left_in_cart = False
@@ -0,0 +1,81 @@
+"""
+Armed pre-release mode.
+
+With ARMED=true the booking script is started a few minutes before the
+release: Chromium is launched, the storage state loaded and the filtered
+search page staged ahead of time. The page is kept hot with small same-origin
+requests, and only the search-and-book step is left for the release instant.
+The release instant is measured on the server's clock (see release_clock.py).
+
+RELEASE_AT overrides the release instant, either as "HH:MM[:SS]" (Montreal
+time, today) or as a full ISO timestamp.
+"""
+import os
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from release_clock import estimate_offset, server_time, sleep_until
+
+MTL = ZoneInfo("America/Toronto")
+
+ARMED = os.getenv("ARMED", "false").lower() == "true"
+KEEPALIVE_SECONDS = 20  # well under typical server keep-alive timeouts
+
+KEEPALIVE_JS = """
+async () => {
+    try {
+        const response = await fetch("/IC3/", { method: "HEAD", cache: "no-store", credentials: "include" });
+        return response.status;
+    } catch (e) {
+        return null;
+    }
+}
+"""
+
+
+def release_instant(now=None):
+    """
+    Next release instant in Montreal time. Releases happen on the hour, so a
+    run started in the first half of an hour targets that hour's :00 (which
+    may already have passed) and a later run targets the next hour.
+    """
+    now = now or datetime.now(MTL)
+    override = os.getenv("RELEASE_AT")
+    if override:
+        if "T" in override:
+            release = datetime.fromisoformat(override)
+            return release if release.tzinfo else release.replace(tzinfo=MTL)
+        parts = [int(x) for x in override.split(":")]
+        hh, mm, ss = (parts + [0, 0])[:3]
+        return now.replace(hour=hh, minute=mm, second=ss, microsecond=0)
+
+    top_of_hour = now.replace(minute=0, second=0, microsecond=0)
+    if now.minute < 30:
+        return top_of_hour
+    return top_of_hour + timedelta(hours=1)
+
+
+def keep_warm(page):
+    status = page.evaluate(KEEPALIVE_JS)
+    if status is None:
+        print("⚠️ [ARMED] Keep-alive request failed")
+
+
+def wait_for_release(page, release_at):
+    """
+    Keep the staged page hot until the server clock reaches release_at, then
+    wake with millisecond precision.
+    """
+    offset, _ = estimate_offset()
+    release_epoch = release_at.timestamp()
+    print(f"[ARMED] Session staged, waiting for release at {release_at.isoformat()} (server time)")
+
+    while release_epoch - server_time(offset) > KEEPALIVE_SECONDS + 1:
+        # page.wait_for_timeout keeps Playwright events flowing while we wait
+        page.wait_for_timeout(KEEPALIVE_SECONDS * 1000)
+        keep_warm(page)
+
+    if release_epoch - server_time(offset) > 0:
+        keep_warm(page)
+    sleep_until(release_epoch, offset)
+    print("🚀 [ARMED] Released")
@@ -0,0 +1,434 @@
+"""
+playwright.async_api port of the final_booking_*.py pipeline.
+
+Every step from run_search to confirm_terms_and_submit has the same
+behaviour as its sync counterpart, but awaits instead of blocking, so one
+event loop can drive many pages and accounts at once: while one page waits
+on a search XHR another can paginate or check out.
+
+Log lines are prefixed with the account set by set_account() (a contextvar,
+so every asyncio task keeps its own prefix).
+
+With HEDGE=true each account races staggered contexts (see hedge.py).
+
+Run a single account directly:
+    ACCOUNT=calvin python async_booking.py
+"""
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+
+from playwright.async_api import TimeoutError as AsyncTimeoutError
+from playwright.async_api import async_playwright
+
+from accounts import find_account, get_target_slot, get_tomorrows_date_str, load_priority_slots
+from armed import ARMED, KEEPALIVE_JS, KEEPALIVE_SECONDS, release_instant
+from boroughs import BOROUGHS, select_borough_async
+from checkout_pipeline import CART_URL
+from claim_ledger import ClaimPicker, make_ledger, release_all
+from fast_click import critical_click_async, print_click_report
+from fast_scan import (
+    CART_OPENED,
+    EXTRACT_ROWS_JS,
+    INPAGE_SCAN_JS,
+    bookable,
+    match_rows,
+    page_quand_index,
+    remember_quand_index,
+)
+from hedge import HEDGE, hedged
+from http_probe import HTTP_PROBE, HttpProbe
+from lean_profile import apply_lean_routes_async, context_options, launch_browser
+from poll_schedule import make_schedule
+from readiness import (
+    click_and_wait_for_table_async,
+    print_wait_report,
+    run_and_wait_for_search_async,
+    wait_for_enabled_async,
+    wait_for_visible_async,
+)
+from release_clock import estimate_offset, sleep_until
+
+SEARCH_URL = "https://loisirs.montreal.ca/IC3/#/U6510/search"
+RETRIES = 40  # attempts for POLL_SCHEDULE=fixed
+SCAN_MODE = os.getenv("SCAN_MODE", "batched").lower()  # "batched" or "inpage"
+FAST_REFRESH = os.getenv("FAST_REFRESH", "true").lower() == "true"
+
+_account = ContextVar("account", default=None)
+
+def set_account(name):
+    _account.set(name)
+
+
+def log(message):
+    name = _account.get()
+    print(f"[{name}] {message}" if name else message)
+
+
+async def run_search(page, date_str):
+    await page.goto(SEARCH_URL, wait_until="domcontentloaded")
+    await wait_for_visible_async(page, "input#u6510_edSearch", "search page")
+
+    log("[UI] Setting filters...")
+    await page.locator("input#u6510_edSearch").fill("pickleball")
+    await select_borough_async(page, BOROUGHS[0])
+
+    date_input = page.locator("input[name='reserveDate']")
+    await date_input.fill("")
+    await run_and_wait_for_search_async(page, lambda: date_input.fill(date_str))
+
+
+SEARCH_STATE_JS = """
+() => {
+    const keyword = document.querySelector("input#u6510_edSearch");
+    return {
+        onSearch: location.hash.includes("/U6510/search"),
+        keyword: keyword ? keyword.value.trim().toLowerCase() : null,
+        hasDate: !!document.querySelector("input[name='reserveDate']"),
+        hasResults: !!document.querySelector("div#searchResult"),
+    };
+}
+"""
+
+
+async def refresh_search(page, date_str):
+    """Re-trigger the search in place. Returns False if the page is stale."""
+    state = await page.evaluate(SEARCH_STATE_JS)
+    if not (state["onSearch"] and state["keyword"] == "pickleball" and state["hasDate"] and state["hasResults"]):
+        log("[UI] Search page is stale, doing a full reload...")
+        return False
+
+    log("[UI] Refreshing search in place...")
+    date_input = page.locator("input[name='reserveDate']")
+    await date_input.fill("")
+    await run_and_wait_for_search_async(page, lambda: date_input.fill(date_str))
+    return True
+
+
+async def add_to_cart(page, row_index):
+    button = page.locator("div#searchResult tbody tr").nth(row_index).locator("button:has(i.fa-plus)")
+    await critical_click_async(button, "add to cart", CART_OPENED)
+
+
+async def cart_has_row(page, timeout=10000):
+    """Load the cart and look for a line. None if the cart didn't settle."""
+    await page.goto(CART_URL, wait_until="domcontentloaded")
+    try:
+        await page.wait_for_load_state("networkidle", timeout=timeout)
+    except AsyncTimeoutError:
+        return None
+    return await page.locator(CART_OPENED).count() > 0
+
+
+async def add_to_cart_hedged(page, row_index, ticket, message):
+    """
+    add_to_cart under the ticket's gate. True once this racer's row is in the
+    cart; the gate is only handed back when the cart shows the add failed.
+    """
+    if not await ticket.acquire():
+        log("⏹️ [HEDGE] Another racer already has the cart.")
+        return False
+    log(message)
+    try:
+        await add_to_cart(page, row_index)
+        in_cart = await wait_for_enabled_async(page, CART_OPENED, "cart opened")
+        if not in_cart:
+            log("⚠️ [HEDGE] Cart didn't open, checking it before handing the gate back...")
+            in_cart = await cart_has_row(page)
+    except BaseException:
+        ticket.release()
+        raise
+    if in_cart is False:
+        log("⚠️ [HEDGE] The row isn't in the cart, handing the gate back.")
+        ticket.release()
+        return False
+    if in_cart is None:
+        # A second racer's add could put a second row in the cart
+        log("⚠️ [HEDGE] Cart didn't load, keeping the gate anyway.")
+    ticket.confirm()
+    return True
+
+
+async def try_find_slot(page, priority_slots, target_date, prefer_second=False, ledger=None, ticket=None):
+    """
+    Only consider rows that match BOTH the target time slot and the target_date (YYYY-MM-DD).
+    A hedged racer holds its ticket's gate from fa-plus until the cart opened.
+    """
+    # The in-page scanner clicks by itself, so hedged racers and ledger claims always scan from Python
+    if SCAN_MODE == "inpage" and ticket is None and ledger is None:
+        return await try_find_slot_inpage(page, priority_slots, target_date, prefer_second=prefer_second)
+
+    log("[SCAN] Scanning for priority slots (with pagination)...")
+    matched = 0
+    # Ledger claims are blocking SQLite/HTTP calls, but short enough to run inline
+    picker = ClaimPicker(prefer_second, ledger, _account.get())
+
+    while True:
+        await page.wait_for_selector("div#searchResult")
+
+        result = await page.evaluate(EXTRACT_ROWS_JS, page_quand_index(page))
+        if result is None or result["quandIndex"] is None:
+            log("❌ 'Quand' column not found.")
+            return None
+        remember_quand_index(page, result)
+
+        for priority, slot, row in match_rows(bookable(result["rows"]), priority_slots, target_date):
+            i = row["index"]
+            matched += 1
+            log(f"🔍 Found match #{matched}: [{target_date}] '{slot}' at row {i+1}")
+
+            if picker.take(target_date, slot, row.get("facility")):
+                if ticket is None:
+                    log(f"✅ [P{priority}] Booking '{slot}'")
+                    await add_to_cart(page, i)
+                    return slot
+                try:
+                    in_cart = await add_to_cart_hedged(page, i, ticket, f"✅ [P{priority}] Booking '{slot}'")
+                except BaseException:
+                    # A cancelled loser must not keep its claim on the row
+                    picker.release()
+                    raise
+                if not in_cart:
+                    picker.release()
+                    return None
+                return slot
+
+        # pagination
+        if result["hasPagination"]:
+            if not result["hasNext"]:
+                log("⛔ Last page reached.")
+                break
+            log("➡️ Moving to next page...")
+            next_li = page.locator("li.pagination-next")
+            await click_and_wait_for_table_async(page, next_li.locator("a.ng-binding", has_text=">"), "next page")
+            continue
+        else:
+            break
+
+    if prefer_second:
+        log("⛔ Fewer than 2 total matches found for the target date — skipping.")
+    else:
+        log("⛔ No matches found for the target date — skipping.")
+    return None
+
+
+async def try_find_slot_inpage(page, priority_slots, target_date, prefer_second=False, page_timeout_ms=5000):
+    """Async fast_scan.try_find_slot_inpage: scan, paginate and click inside the page."""
+    log("[SCAN] Scanning for priority slots in-page (with pagination)...")
+    await page.wait_for_selector("div#searchResult")
+    result = await page.evaluate(
+        "opts => {" + INPAGE_SCAN_JS + " return window.__pbScanAndClick(opts); }",
+        {
+            "slots": priority_slots,
+            "targetDate": target_date,
+            "preferSecond": prefer_second,
+            "pageTimeoutMs": page_timeout_ms,
+        },
+    )
+    for n, match in enumerate(result["matches"], 1):
+        log(f"🔍 Found match #{n}: [{target_date}] '{match['slot']}' at row {match['row']+1} (page {match['page']})")
+    if result["status"] == "clicked":
+        match = result["matches"][-1]
+        log(f"✅ [P{match['priority']}] Booked '{match['slot']}' in-page")
+        return match["slot"]
+    log(f"⛔ No slot taken in-page ({result['status']}).")
+    return None
+
+
+async def select_user_and_confirm(page):
+    page.set_default_timeout(30000)  # safety timeout for all waits
+
+    log("[STEP] Selecting user...")
+    select_button = page.locator("button#u3600_btnSelect0")
+    for attempt in range(2):  # retry once in case of detach
+        try:
+            await critical_click_async(select_button, "select user", timeout=10000)
+            break
+        except Exception as e:
+            if "detached" in str(e).lower() and attempt == 0:
+                select_button = page.locator("button#u3600_btnSelect0")
+                continue
+            raise
+
+    log("[STEP] Confirming cart...")
+    await critical_click_async(
+        page.locator("button#u3600_btnCheckout0"), "cart confirm", "button#u3600_btnCartShoppingCompleteStep", timeout=10000
+    )
+
+
+async def finalize_checkout(page):
+    log("[STEP] Finalizing checkout...")
+    complete_button = page.locator("button#u3600_btnCartShoppingCompleteStep")
+    await complete_button.wait_for(state="visible", timeout=5000)
+    await critical_click_async(complete_button, "cart step", "#u3600_chkElectronicPaymentCondition")
+    log("✅ Cart section confirmed.")
+
+
+async def confirm_terms_and_submit(page):
+    log("[STEP] Accepting conditions...")
+
+    checkbox1 = page.locator("#u3600_chkElectronicPaymentCondition")
+    await checkbox1.wait_for(state="visible", timeout=5000)
+    await checkbox1.check()
+
+    checkbox2 = page.locator("#u3600_chkLocationCondition")
+    await checkbox2.wait_for(state="visible", timeout=5000)
+    await checkbox2.check()
+
+    log("[STEP] Submitting final confirmation...")
+    confirm_button = page.locator("button#u3600_btnCartPaymentCompleteStep")
+    await confirm_button.wait_for(state="visible", timeout=5000)
+    await critical_click_async(confirm_button, "payment step", retry=False)  # never submit the payment twice
+
+    log("🎉 Reservation fully confirmed!")
+
+
+async def checkout(page):
+    await wait_for_enabled_async(page, "button#u3600_btnSelect0", "user select ready")
+    await select_user_and_confirm(page)
+    await wait_for_enabled_async(page, "button#u3600_btnCartShoppingCompleteStep", "cart step ready")
+    await finalize_checkout(page)
+    await wait_for_visible_async(page, "#u3600_chkElectronicPaymentCondition", "payment step ready")
+    await confirm_terms_and_submit(page)
+
+
+async def keep_warm_until(page, released):
+    """Keep a staged page hot until the released event is set."""
+    while not released.is_set():
+        try:
+            await asyncio.wait_for(released.wait(), KEEPALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            await page.evaluate(KEEPALIVE_JS)
+
+
+async def release_when_ready(release_at, released):
+    """Wait for the server release instant off the event loop, then set released."""
+    offset, _ = await asyncio.to_thread(estimate_offset)
+    await asyncio.to_thread(sleep_until, release_at.timestamp(), offset)
+    log("🚀 [ARMED] Released")
+    released.set()
+
+
+async def book(page, priority_slots, date_str, prefer_second, release_epoch, released=None, probe=None, ledger=None,
+               ticket=None):
+    """
+    The retry loop of final_booking_*.main() for one page.
+    Returns the booked slot, or None once the polling schedule runs out.
+    """
+    if probe is not None:
+        probe.attach(page)
+
+    if released is not None:
+        log("[ARMED] Staging search page ahead of the release...")
+        await run_search(page, date_str)
+        await keep_warm_until(page, released)
+    if ticket is not None and ticket.stagger:
+        # After the release when ARMED, so racers don't all search at once
+        log(f"[HEDGE] Starting {ticket.stagger * 1000:.0f}ms after the first racer...")
+        await asyncio.sleep(ticket.stagger)
+
+    schedule = make_schedule(release_epoch, retries=RETRIES)
+    attempt = 0
+    while True:
+        log(f"[{schedule.describe()}] Checking for time slots on {date_str}...")
+        started = time.perf_counter()
+        found_slot = None
+        # Once the probe knows the search XHR, only wake the browser on a hit
+        if probe and probe.template and not await asyncio.to_thread(
+            probe.should_wake_browser, priority_slots, date_str, 2 if prefer_second and not ledger else 1
+        ):
+            log("[PROBE] No matching slot yet, browser stays idle.")
+        else:
+            if not ((attempt > 0 or released is not None) and FAST_REFRESH and await refresh_search(page, date_str)):
+                await run_search(page, date_str)
+            found_slot = await try_find_slot(
+                page, priority_slots, date_str, prefer_second=prefer_second, ledger=ledger, ticket=ticket
+            )
+
+        if found_slot:
+            log(f"🟢 Slot '{found_slot}' selected.")
+            try:
+                await checkout(page)
+            except BaseException:
+                release_all(ledger, _account.get())
+                raise
+            return found_slot
+
+        schedule.observe(time.perf_counter() - started)
+        delay = schedule.next_delay()
+        if delay is None:
+            log("❌ No priority slots found after retry window.")
+            return None
+        log("🔄 No available slot found. Retrying...")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def book_in_context(browser, account, priority_slots, date_str, release_epoch, released=None, ledger=None,
+                          ticket=None):
+    """book() in a fresh context logged in as account. Returns the booked slot or None."""
+    context = await browser.new_context(storage_state=account["storage_state"], **context_options())
+    await apply_lean_routes_async(context)
+    page = await context.new_page()
+    probe = HttpProbe(account["storage_state"]) if HTTP_PROBE else None
+    try:
+        return await book(
+            page, priority_slots, date_str, account.get("prefer_second", False), release_epoch, released,
+            probe=probe, ledger=ledger, ticket=ticket,
+        )
+    finally:
+        await context.close()
+
+
+async def book_account(browser, account, priority_slots, date_str, release_epoch, released=None, ledger=None):
+    """book_in_context, or HEDGE_RACERS staggered contexts racing for the account's cart."""
+    set_account(account["name"])
+    if SCAN_MODE == "inpage" and ledger:
+        log("⚠️ [LEDGER] The in-page scanner can't claim rows first, scanning from Python instead.")
+    if not HEDGE:
+        return await book_in_context(browser, account, priority_slots, date_str, release_epoch, released, ledger)
+
+    async def racer(ticket, n):
+        set_account(f"{account['name']}#{n + 1}")
+        return await book_in_context(
+            browser, account, priority_slots, date_str, release_epoch, released, ledger, ticket
+        )
+
+    return await hedged(racer, log)
+
+
+async def main():
+    name = os.getenv("ACCOUNT", "calvin")
+    account = find_account(name)
+    if account is None:
+        print(f"❌ Unknown ACCOUNT '{name}' (see accounts.json), exiting.")
+        return
+    set_account(name)
+
+    priority_slots = get_target_slot(account, load_priority_slots())
+    if not priority_slots:
+        log("❌ No target slot for this run, exiting.")
+        return
+    date_str = get_tomorrows_date_str()
+    release_at = release_instant()
+    released = asyncio.Event() if ARMED else None
+
+    async with async_playwright() as p:
+        headless_mode = os.getenv("HEADLESS", "true").lower() == "true"
+        browser = await launch_browser(p, headless=headless_mode)
+        tasks = [
+            book_account(browser, account, priority_slots, date_str, release_at.timestamp(), released, make_ledger())
+        ]
+        if released is not None:
+            tasks.append(release_when_ready(release_at, released))
+        await asyncio.gather(*tasks)
+
+        print_wait_report()
+        print_click_report()
+        await asyncio.sleep(5)
+        await browser.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,206 @@
+"""
+Borough / facility preferences and multi-borough search.
+
+run_search used to tick Saint-Léonard through its hard-coded checkbox id
+(input#u2000_chkValue11). BOROUGHS is now a ranked, comma-separated list of
+borough names that select_borough resolves against the labels of the borough
+tree (case- and accent-insensitive), e.g.
+
+    BOROUGHS="Saint-Léonard,Anjou,Rosemont–La Petite-Patrie"
+
+A name that doesn't resolve raises BoroughNotFound instead of searching with
+whatever happens to be ticked: for the first borough that aborts the run, an
+extra borough is skipped.
+
+The first borough is searched on the main page. With more than one,
+try_find_slot_boroughs keeps one extra page per borough, re-runs all their
+searches at the same time and merges every match into one candidate list,
+ranked by slot priority, then borough rank, then FACILITIES rank (an
+optional comma-separated list of facility names, matched as substrings).
+"""
+import os
+import re
+import unicodedata
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from claim_ledger import ClaimPicker
+from fast_scan import EXTRACT_ROWS_JS, add_to_cart, bookable, extract_rows, match_rows
+from page_fanout import refresh_all
+from readiness import TABLE_CHANGED_JS, TBODY_TEXT_JS, click_and_wait_for_table
+
+
+def _names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+BOROUGHS = _names(os.getenv("BOROUGHS", "Saint-Léonard"))
+FACILITIES = _names(os.getenv("FACILITIES", ""))
+
+
+class BoroughNotFound(Exception):
+    """A BOROUGHS name matches no checkbox of the borough tree."""
+
+
+# Checkbox ids confirmed on the live tree, used if a label lookup fails
+KNOWN_CHECKBOXES = {"saint leonard": "u2000_chkValue11"}
+
+RESOLVE_BOROUGH_JS = """
+(name) => {
+    const norm = (s) => (s || "").normalize("NFD").replace(/[\\u0300-\\u036f]/g, "")
+        .toLowerCase().replace(/[^a-z0-9]+/g, " ").trim();
+    const wanted = norm(name);
+    const boxes = Array.from(document.querySelectorAll("input[id^='u2000_chkValue']"));
+    const labelOf = (box) => {
+        const label = document.querySelector(`label[for='${box.id}']`) || box.closest("label");
+        return norm(label ? label.innerText : box.parentElement && box.parentElement.innerText);
+    };
+    const box = boxes.find((b) => labelOf(b) === wanted) || boxes.find((b) => labelOf(b).includes(wanted));
+    return {
+        id: box ? box.id : null,
+        checked: boxes.filter((b) => b.checked).map((b) => b.id),
+    };
+}
+"""
+
+
+def normalise_name(name):
+    """'Saint-Léonard' -> 'saint leonard', the same folding RESOLVE_BOROUGH_JS does."""
+    folded = unicodedata.normalize("NFD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", " ", folded.lower()).strip()
+
+
+def _pick_checkbox(resolved, name):
+    box_id = resolved["id"] or KNOWN_CHECKBOXES.get(normalise_name(name))
+    if box_id is None:
+        raise BoroughNotFound(f"'{name}' not found in the borough tree")
+    return box_id
+
+
+def select_borough(page, name):
+    """Tick exactly one borough in the tree. Raises BoroughNotFound if name can't be resolved."""
+    page.locator("button#u6510_btnTreeBorough").click()
+    page.locator("input[id^='u2000_chkValue']").first.wait_for(state="visible")
+    resolved = page.evaluate(RESOLVE_BOROUGH_JS, name)
+    box_id = _pick_checkbox(resolved, name)
+    for other in resolved["checked"]:
+        if other != box_id:
+            page.locator(f"input#{other}").click()
+    # ✅ Only select the borough if not already checked
+    checkbox = page.locator(f"input#{box_id}")
+    checkbox.wait_for(state="visible")
+    if not checkbox.is_checked():
+        checkbox.click()
+    page.locator("button#u2000_btnTreeSelectConfirm").click()
+
+
+async def select_borough_async(page, name):
+    await page.locator("button#u6510_btnTreeBorough").click()
+    await page.locator("input[id^='u2000_chkValue']").first.wait_for(state="visible")
+    resolved = await page.evaluate(RESOLVE_BOROUGH_JS, name)
+    box_id = _pick_checkbox(resolved, name)
+    for other in resolved["checked"]:
+        if other != box_id:
+            await page.locator(f"input#{other}").click()
+    checkbox = page.locator(f"input#{box_id}")
+    await checkbox.wait_for(state="visible")
+    if not await checkbox.is_checked():
+        await checkbox.click()
+    await page.locator("button#u2000_btnTreeSelectConfirm").click()
+
+
+def facility_rank(facility):
+    """Position of the first FACILITIES name in facility, or len(FACILITIES) if none."""
+    text = normalise_name(facility or "")
+    for rank, name in enumerate(FACILITIES):
+        if normalise_name(name) in text:
+            return rank
+    return len(FACILITIES)
+
+
+_borough_pages = {}  # main page -> [(page, borough) for BOROUGHS[1], BOROUGHS[2], ...]
+
+
+def borough_pages(page, stage):
+    """
+    The extra (page, borough) pairs for main page, opened and staged on first
+    use. stage(tab, borough) loads the search page filtered on borough; a
+    borough the tree doesn't know is skipped.
+    """
+    if page not in _borough_pages:
+        tabs = []
+        for borough in BOROUGHS[1:]:
+            print(f"[BOROUGH] Opening a page for {borough}...")
+            tab = page.context.new_page()
+            try:
+                stage(tab, borough)
+            except BoroughNotFound as e:
+                print(f"❌ [BOROUGH] {e}, skipping it.")
+                tab.close()
+                continue
+            tabs.append((tab, borough))
+        _borough_pages[page] = tabs
+    return _borough_pages[page]
+
+
+def _collect(page, rank, borough, priority_slots, target_date, candidates):
+    """Add every match of one borough page, across its result pages, to candidates."""
+    page.wait_for_selector("div#searchResult")
+    results_page = 1
+    while True:
+        result = extract_rows(page)
+        if result is None or result["quandIndex"] is None:
+            print(f"❌ [{borough}] 'Quand' column not found.")
+            return
+        for priority, slot, row in match_rows(bookable(result["rows"]), priority_slots, target_date):
+            key = (priority, rank, facility_rank(row.get("facility")), results_page, row["index"])
+            candidates.append((key, slot, row, page, borough))
+        if not (result["hasPagination"] and result["hasNext"]):
+            return
+        next_li = page.locator("li.pagination-next")
+        click_and_wait_for_table(page, next_li.locator("a.ng-binding", has_text=">"), "next page")
+        results_page += 1
+
+
+def _show_results_page(page, results_page, timeout=5000):
+    """Jump back to a numbered results page after _collect walked past it."""
+    before = page.evaluate(TBODY_TEXT_JS)
+    page.locator("ul.pagination li a", has_text=re.compile(rf"^\s*{results_page}\s*$")).first.click()
+    try:
+        page.wait_for_function(TABLE_CHANGED_JS, arg=before, polling="raf", timeout=timeout)
+    except PlaywrightTimeoutError:
+        print("⚠️ [BOROUGH] Results page did not re-render in time.")
+
+
+def try_find_slot_boroughs(page, priority_slots, target_date, stage, prefer_second=False, ledger=None, account=None):
+    """
+    Search every borough at once and take the best merged match.
+    page already shows fresh results for BOROUGHS[0].
+    Returns (slot, page the row was added on); slot is None if nothing was taken.
+    """
+    searched = [(page, BOROUGHS[0])] + borough_pages(page, stage)
+    print(f"[SCAN] Searching {len(searched)} boroughs in parallel...")
+    refresh_all([tab for tab, _ in searched[1:]], target_date)
+
+    candidates = []
+    for rank, (tab, borough) in enumerate(searched):
+        _collect(tab, rank, borough, priority_slots, target_date, candidates)
+    candidates.sort(key=lambda c: c[0])
+
+    picker = ClaimPicker(prefer_second, ledger, account)
+    for n, (key, slot, row, tab, borough) in enumerate(candidates, 1):
+        priority, _, _, results_page, i = key
+        print(f"🔍 Found match #{n}: [{target_date}] '{slot}' in {borough} ({row.get('facility') or '?'}), page {results_page}, row {i+1}")
+        if not picker.take(target_date, slot, row.get("facility")):
+            continue
+        current = tab.evaluate(EXTRACT_ROWS_JS, None)
+        if current is None or current["rows"][i:i + 1] != [row]:
+            _show_results_page(tab, results_page)
+        print(f"✅ [P{priority}] Booking '{slot}' in {borough}")
+        if tab is not page:
+            tab.bring_to_front()
+        add_to_cart(tab, i)
+        return slot, tab
+
+    print(f"⛔ No match could be taken in {len(searched)} borough(s).")
+    return None, page
@@ -0,0 +1,200 @@
+"""
+Pipelined checkout.
+
+With PIPELINED_CHECKOUT=true:
+
+- prepare_cart_tab opens the cart route (CART_URL) in a second tab of the
+  context before the release. That loads the U3600 cart code and assets into
+  the browser cache ahead of time, and clears stale items left in the cart by
+  earlier runs, so the checkout only carries the row we are about to add.
+- run_checkout_pipeline replaces the select/finalize/confirm sequence. Every
+  step clicks the moment its button is enabled, which is when the previous
+  step's response has rendered. The payment-condition checkboxes are ticked
+  by a MutationObserver the instant they are added to the DOM, so they are
+  already checked when the submit button appears.
+
+CART_URL defaults to the U3600 route the u3600_* checkout elements live on.
+"""
+import os
+import time
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from fast_click import critical_click
+from readiness import wait_for_condition, wait_for_step
+
+PIPELINED_CHECKOUT = os.getenv("PIPELINED_CHECKOUT", "false").lower() == "true"
+CART_URL = os.getenv("CART_URL", "https://loisirs.montreal.ca/IC3/#/U3600/cart")
+
+TERMS_CHECKBOXES = ["u3600_chkElectronicPaymentCondition", "u3600_chkLocationCondition"]
+
+# Cart lines by number: a u3600_btnRemove<n> / u3600_btnDelete<n> button, or a
+# trash/times icon in the row of cart line n's u3600_btnSelect<n>
+CART_LINES_JS = """
+const cartLines = () => {
+    const lines = new Map();  // n -> {button, row}
+    for (const button of document.querySelectorAll("button")) {
+        const row = button.closest("tr");
+        const byId = /^u3600_btn(?:Remove|Delete)(\\d+)$/i.exec(button.id);
+        let n = null;
+        if (byId) {
+            n = Number(byId[1]);
+        } else {
+            const select = row && row.querySelector("button[id^='u3600_btnSelect']");
+            if (select && button.querySelector("i.fa-trash, i.fa-trash-o, i.fa-times")) {
+                n = Number(select.id.slice("u3600_btnSelect".length));
+            }
+        }
+        if (n !== null && !Number.isNaN(n) && !lines.has(n)) {
+            lines.set(n, { button: button, row: row });
+        }
+    }
+    return lines;
+};
+"""
+
+# Remove the lines whose row text matches pattern (every line without one).
+# Returns their numbers and how many lines the cart had.
+REMOVE_ITEMS_JS = "(pattern) => {" + CART_LINES_JS + """
+    const re = pattern ? new RegExp(pattern, "i") : null;
+    const lines = cartLines();
+    const removed = Array.from(lines.keys())
+        .filter((n) => !re || (lines.get(n).row && re.test(lines.get(n).row.innerText)))
+        // Last line first, so the lines still to remove keep their numbers
+        .sort((a, b) => b - a);
+    removed.forEach((n) => lines.get(n).button.click());
+    return { removed: removed, lines: lines.size };
+}
+"""
+
+CART_LINES_LEFT_JS = "(left) => {" + CART_LINES_JS + "return cartLines().size <= left; }"
+
+# Tick the payment conditions as soon as they exist; one observer at a time
+TICK_TERMS_JS = """
+(ids) => {
+    if (window.__pbTermsObserver) {
+        return;
+    }
+    const tick = () => {
+        let all = true;
+        for (const id of ids) {
+            const box = document.getElementById(id);
+            if (!box) {
+                all = false;
+            } else if (!box.checked) {
+                box.click();
+            }
+        }
+        return all;
+    };
+    if (tick()) {
+        return;
+    }
+    const observer = new MutationObserver(() => {
+        if (tick()) {
+            observer.disconnect();
+            // A later checkout in this document (conflict recovery) arms a new one
+            window.__pbTermsObserver = null;
+        }
+    });
+    observer.observe(document.body, { childList: true, subtree: true });
+    window.__pbTermsObserver = observer;
+}
+"""
+
+TERMS_READY_JS = """
+(ids) => ids.every((id) => {
+    const box = document.getElementById(id);
+    return !!box && box.checked;
+}) && (() => {
+    const submit = document.querySelector("button#u3600_btnCartPaymentCompleteStep");
+    return !!submit && !submit.disabled && submit.getClientRects().length > 0;
+})()
+"""
+
+
+def remove_cart_lines(tab, pattern=None):
+    """Remove the cart lines whose text matches pattern, or every line. Returns their numbers."""
+    result = tab.evaluate(REMOVE_ITEMS_JS, pattern)
+    removed = result["removed"]
+    # The cart re-renders without a line once the server dropped it
+    if removed and not wait_for_condition(
+        tab, CART_LINES_LEFT_JS, result["lines"] - len(removed), "cart lines removed"
+    ):
+        print("⚠️ [CART] The cart still shows removed lines.")
+    return removed
+
+
+def clear_cart(tab):
+    removed = len(remove_cart_lines(tab))
+    if removed:
+        print(f"🧹 [CART] Removed {removed} stale cart item(s).")
+    else:
+        print("[CART] Cart is empty.")
+    return removed
+
+
+def prepare_cart_tab(context):
+    """Open the cart in its own tab and empty it. Returns the tab, or None if the cart didn't load."""
+    print("[CART] Pre-warming the cart tab...")
+    tab = context.new_page()
+    tab.on("dialog", lambda dialog: dialog.accept())  # remove confirmations
+    try:
+        tab.goto(CART_URL, wait_until="domcontentloaded")
+        tab.wait_for_load_state("networkidle", timeout=10000)
+        clear_cart(tab)
+    except PlaywrightTimeoutError:
+        print("⚠️ [CART] Cart route did not settle, continuing without a warm cart.")
+        return None
+    return tab
+
+
+def _click(page, selector, label, effect_selector=None, retry=True):
+    wait_for_step(page, selector, label)
+    critical_click(page.locator(selector), label.replace(" ready", ""), effect_selector, retry=retry)
+
+
+def select_other_users(page, cart_size):
+    """Select the user for cart items 1..cart_size-1; item 0 goes through the usual step."""
+    for n in range(1, cart_size):
+        select = f"button#u3600_btnSelect{n}"
+        if page.locator(select).count() == 0:
+            print("[CART] One user selection covers the whole cart.")
+            return
+        print(f"[STEP] Selecting user for cart item {n + 1}...")
+        _click(page, select, f"user select {n} ready")
+        if page.locator(f"button#u3600_btnCheckout{n}").count():
+            _click(page, f"button#u3600_btnCheckout{n}", f"cart confirm {n} ready")
+
+
+def run_checkout_pipeline(page, mark_step=lambda step: None, timeout=15000, cart_size=1):
+    """select_user -> complete_cart -> payment, each step on its predecessor's render."""
+    start = time.perf_counter()
+    page.set_default_timeout(timeout)
+    page.evaluate(TICK_TERMS_JS, TERMS_CHECKBOXES)
+
+    mark_step("select_user")
+    print("[STEP] Selecting user...")
+    _click(page, "button#u3600_btnSelect0", "user select ready")
+    print("[STEP] Confirming cart...")
+    _click(page, "button#u3600_btnCheckout0", "cart confirm ready", "button#u3600_btnCartShoppingCompleteStep")
+    select_other_users(page, cart_size)
+
+    mark_step("complete_cart")
+    print("[STEP] Finalizing checkout...")
+    _click(page, "button#u3600_btnCartShoppingCompleteStep", "cart step ready", "#u3600_chkElectronicPaymentCondition")
+    print("✅ Cart section confirmed.")
+
+    mark_step("payment")
+    # The checkout can re-render the document, so re-arm the observer
+    page.evaluate(TICK_TERMS_JS, TERMS_CHECKBOXES)
+    try:
+        page.wait_for_function(TERMS_READY_JS, arg=TERMS_CHECKBOXES, polling="raf", timeout=timeout)
+    except PlaywrightTimeoutError:
+        print("⚠️ [STEP] Conditions not ticked in time, ticking them directly...")
+        for box_id in TERMS_CHECKBOXES:
+            page.locator(f"#{box_id}").check()
+    print("[STEP] Submitting final confirmation...")
+    _click(page, "button#u3600_btnCartPaymentCompleteStep", "payment step ready", retry=False)
+
+    print(f"🎉 Reservation fully confirmed! (checkout {(time.perf_counter() - start) * 1000:.0f}ms)")
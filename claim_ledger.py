@@ -0,0 +1,214 @@
+"""
+Cross-process slot claim ledger.
+
+Without a ledger the only coordination between accounts is prefer_second
+(calvin/tommy take the first match, ricky/sylvia the second), which collides
+as soon as only one court is left. With CLAIM_LEDGER set, a booker atomically
+claims a specific (date, slot, facility, occurrence) row before clicking
+fa-plus; rows already claimed by another account are skipped at once.
+
+CLAIM_LEDGER:
+    /tmp/pickleball_claims.db     SQLite file shared by processes on one runner
+    http://host:8765              HTTP stand-in for bookers on several machines
+
+A claim not refreshed within CLAIM_TTL seconds (default 180) is stale and can
+be taken over, so a booker that crashed mid-checkout doesn't hold its row for
+the rest of the day. A picker that claims a new row gives up the previous
+one, and a checkout that raises releases every claim of the account
+(release_all).
+
+Run the HTTP stand-in (backed by SQLite) with:
+    python claim_ledger.py [port] [db_path]
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+CLAIM_LEDGER = os.getenv("CLAIM_LEDGER", "")
+CLAIM_TTL = int(os.getenv("CLAIM_TTL", "180"))
+
+
+class SqliteLedger:
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = CLAIM_TTL if ttl is None else ttl
+        with closing(self._connect()) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS claims (
+                    key TEXT PRIMARY KEY,
+                    account TEXT NOT NULL,
+                    claimed_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def claim(self, key, account):
+        """True if account now owns key (newly claimed, already its own, or taken over from a stale claim)."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM claims WHERE key = ? AND claimed_at < ?", (key, now - self.ttl))
+            conn.execute(
+                "INSERT OR IGNORE INTO claims (key, account, claimed_at) VALUES (?, ?, ?)",
+                (key, account, now),
+            )
+            owner = conn.execute("SELECT account FROM claims WHERE key = ?", (key,)).fetchone()[0]
+            if owner == account:
+                conn.execute("UPDATE claims SET claimed_at = ? WHERE key = ?", (now, key))
+            conn.execute("COMMIT")
+        return owner == account
+
+    def release(self, key, account):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM claims WHERE key = ? AND account = ?", (key, account))
+
+    def release_all(self, account):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM claims WHERE account = ?", (account,))
+
+
+class HttpLedger:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+
+    def _post(self, action, key, account=None):
+        response = self.session.post(f"{self.url}/{action}", json={"key": key, "account": account}, timeout=2)
+        response.raise_for_status()
+        return response.json()
+
+    def claim(self, key, account):
+        try:
+            return self._post("claim", key, account)["granted"]
+        except requests.RequestException as e:
+            # Never block a booking on the ledger being down
+            print(f"⚠️ [LEDGER] Claim request failed, booking anyway: {e}")
+            return True
+
+    def release(self, key, account):
+        try:
+            self._post("release", key, account)
+        except requests.RequestException as e:
+            print(f"⚠️ [LEDGER] Release request failed: {e}")
+
+    def release_all(self, account):
+        try:
+            self._post("release_all", None, account)
+        except requests.RequestException as e:
+            print(f"⚠️ [LEDGER] Release request failed: {e}")
+
+
+def make_ledger(spec=None):
+    spec = CLAIM_LEDGER if spec is None else spec
+    if not spec:
+        return None
+    if spec.startswith(("http://", "https://")):
+        return HttpLedger(spec)
+    return SqliteLedger(spec)
+
+
+def row_key(target_date, slot, facility, occurrence):
+    return f"{target_date}|{slot}|{facility or ''}|{occurrence}"
+
+
+class ClaimPicker:
+    """
+    Decides which matched row a booker takes, fed the matches of one scan in
+    priority/row order. With a ledger: the first row this account can claim.
+    Without: the legacy first/second occurrence rule.
+    """
+
+    def __init__(self, prefer_second=False, ledger=None, account=None):
+        self.wanted = 2 if prefer_second else 1
+        self.ledger = ledger
+        self.account = account
+        self.matched = 0
+        self.occurrences = {}
+        self.key = None  # key of the row taken, for release()
+
+    def take(self, target_date, slot, facility=None, occurrence=None):
+        self.matched += 1
+        if self.ledger is None:
+            return self.matched == self.wanted
+
+        # Identical (date, slot, facility) rows are told apart by occurrence,
+        # counted here unless the caller already knows it
+        if occurrence is None:
+            occurrence = self.count(slot, facility)
+        key = row_key(target_date, slot, facility, occurrence)
+        if self.ledger.claim(key, self.account):
+            print(f"🔒 [LEDGER] {self.account} claimed {key}")
+            if self.key != key:
+                self.release()  # one row per picker: give up the previous one
+            self.key = key
+            return True
+        print(f"⏭️ [LEDGER] {key} already claimed by another booker")
+        return False
+
+    def count(self, slot, facility=None):
+        """Number the next occurrence of (slot, facility) in scan order."""
+        base = (slot, facility or "")
+        self.occurrences[base] = self.occurrences.get(base, 0) + 1
+        return self.occurrences[base]
+
+    def rearm(self):
+        """Give up the taken row and take the next match offered, e.g. after a checkout conflict."""
+        self.release()
+        self.matched = self.wanted - 1
+
+    def release(self):
+        if self.ledger is not None and self.key is not None:
+            self.ledger.release(self.key, self.account)
+            print(f"🔓 [LEDGER] {self.account} released {self.key}")
+            self.key = None
+
+
+def release_all(ledger, account):
+    """Drop every claim of account, e.g. when its checkout raised."""
+    if ledger is not None:
+        ledger.release_all(account)
+        print(f"🔓 [LEDGER] {account} released all its claims")
+
+
+def serve(port=8765, db_path="claims.db"):
+    ledger = SqliteLedger(db_path)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/claim":
+                result = {"granted": ledger.claim(body["key"], body["account"])}
+            elif self.path == "/release":
+                ledger.release(body["key"], body["account"])
+                result = {"released": True}
+            elif self.path == "/release_all":
+                ledger.release_all(body["account"])
+                result = {"released": True}
+            else:
+                self.send_error(404)
+                return
+            payload = json.dumps(result).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    print(f"[LEDGER] Serving claims from {db_path} on port {port}")
+    ThreadingHTTPServer(("", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    serve(int(args[0]) if args else 8765, args[1] if len(args) > 1 else "claims.db")
@@ -0,0 +1,155 @@
+"""
+In-flow conflict recovery.
+
+If another user takes the row between our fa-plus click and the payment step,
+checkout used to run into a 10s timeout and the run went back to run_search
+with a full page.goto. Now:
+
+- checkout steps wait with readiness.wait_for_step, which raises SlotConflict
+  the moment the cart shows a "no longer available" style error, and
+  watch_cart_errors notes any 409/410/422 XHR response, so a step timeout can
+  be explained by the server as well as by the DOM;
+- try_find_slot remembers the matches it saw after the one it took
+  (remember_candidates);
+- checkout_with_recovery removes only the cart lines flagged as unavailable
+  and releases their claims. Extra MAX_CART_ROWS lines that are still fine
+  stay in the cart. If the searched row was lost, it returns to the result
+  table by going back in history (or finds it still on the page) and adds the
+  next remembered candidate, releasing its claim on the lost row first (the
+  same picker, re-armed, so the legacy no-ledger rule takes it too).
+
+Only when nothing is left in the cart does the caller fall back to its retry loop.
+"""
+from playwright.sync_api import Error as PlaywrightError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from checkout_pipeline import CART_URL, clear_cart, remove_cart_lines
+from fast_scan import CART_OPENED, add_to_cart, extract_rows
+from readiness import CONFLICT_TEXT, STEP_OR_CONFLICT_JS, SlotConflict
+
+CONFLICT_STATUSES = (409, 410, 422)
+
+_candidates = {}  # page -> {"picker", "target_date", "rows": [(priority, slot, row), ...]}
+_errors = {}  # page -> last conflict-like XHR response
+
+
+def watch_cart_errors(page):
+    def on_response(response):
+        if response.request.resource_type in ("xhr", "fetch") and response.status in CONFLICT_STATUSES:
+            _errors[page] = f"HTTP {response.status} from {response.url}"
+
+    page.on("response", on_response)
+
+
+def remember_candidates(page, picker, target_date, rows):
+    """Keep the matches after the one just added, in scan order, for a retry without searching."""
+    _candidates[page] = {"picker": picker, "target_date": target_date, "rows": list(rows)}
+    _errors.pop(page, None)
+
+
+def conflict_message(page):
+    """The visible cart error or conflicting XHR, or None if checkout failed for another reason."""
+    try:
+        # An unmatched selector makes the script report only the alert text
+        state = page.evaluate(STEP_OR_CONFLICT_JS, ["#__pb_no_such_element", CONFLICT_TEXT])
+    except PlaywrightError:
+        state = None
+    return state or _errors.pop(page, None)
+
+
+def back_to_results(page, timeout=5000):
+    if page.locator("div#searchResult tbody tr").count() > 0:
+        return True
+    print("[CONFLICT] Going back to the result table...")
+    page.go_back(wait_until="domcontentloaded")
+    try:
+        page.wait_for_selector("div#searchResult tbody tr", timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        print("⚠️ [CONFLICT] Result table didn't come back.")
+        return False
+
+
+def take_next_candidate(page):
+    """Add the next remembered match in place of the lost row. Returns its slot or None."""
+    state = _candidates.pop(page, None)
+    if state:
+        state["picker"].rearm()
+    if not state or not state["rows"]:
+        print("[CONFLICT] No other candidate from the last scan.")
+        return None
+    picker = state["picker"]
+    if not back_to_results(page):
+        return None
+
+    result = extract_rows(page)
+    live = {row["index"]: row for row in result["rows"]} if result else {}
+    rows = state["rows"]
+    while rows:
+        priority, slot, row = rows.pop(0)
+        # Count every remembered row, gone or not, so ledger keys match the scan's
+        occurrence = picker.count(slot, row.get("facility"))
+        current = live.get(row["index"])
+        if not current or current["quand"] != row["quand"] or not current["hasButton"]:
+            continue
+        if picker.take(state["target_date"], slot, row.get("facility"), occurrence):
+            print(f"✅ [P{priority}] Falling back to '{slot}' at row {row['index']+1}")
+            add_to_cart(page, row["index"])
+            remember_candidates(page, picker, state["target_date"], rows)
+            return slot
+    print("[CONFLICT] Every remembered candidate is gone.")
+    return None
+
+
+def drop_lost_lines(page, lines):
+    """
+    Remove the cart lines flagged as unavailable (every line if none is) and
+    release the claims of the extra slots among them. lines are the cart's
+    (slot, picker) pairs in cart order, picker None for the searched slot.
+    Returns the lines left and whether the searched slot was lost.
+    """
+    removed = remove_cart_lines(page, CONFLICT_TEXT)
+    if not removed:
+        clear_cart(page)  # the failed line isn't flagged, so nothing else can be trusted
+        removed = range(len(lines))
+    kept, main_lost = [], False
+    for n, (slot, picker) in enumerate(lines):
+        if n not in removed:
+            kept.append((slot, picker))
+            continue
+        print(f"🧹 [CONFLICT] Removed '{slot}' from the cart.")
+        if picker is None:
+            main_lost = True
+        else:
+            picker.release()
+    return kept, main_lost
+
+
+def checkout_with_recovery(page, slot, checkout, extras=()):
+    """
+    Run checkout(page, cart_size) on slot plus the extra (slot, picker) lines
+    fill_cart added. On a conflict drop the lost lines, replace the searched
+    slot with the next candidate if it was among them, and check out again.
+    Returns the booked slots, searched slot first, or None.
+    """
+    lines = [(slot, None)] + list(extras)
+    while True:
+        try:
+            checkout(page, len(lines))
+            return [slot for slot, picker in lines if picker is None] + [slot for slot, picker in lines if picker]
+        except (SlotConflict, PlaywrightTimeoutError) as e:
+            reason = str(e) if isinstance(e, SlotConflict) else conflict_message(page)
+            if reason is None:
+                raise
+            print(f"⚠️ [CONFLICT] Checkout of {', '.join(slot for slot, _ in lines)} hit a conflict: {reason}")
+            lines, main_lost = drop_lost_lines(page, lines)
+            if main_lost:
+                slot = take_next_candidate(page)
+                if slot is not None:
+                    print(f"🟢 Slot '{slot}' selected.")
+                    lines.append((slot, None))  # added after the remaining lines
+            if not lines:
+                return None
+            if page.locator(CART_OPENED).count() == 0:
+                print("[CART] Reopening the cart...")
+                page.goto(CART_URL, wait_until="domcontentloaded")
@@ -0,0 +1,175 @@
+"""
+Fast clicks for the critical path.
+
+locator.click() waits for the element to be visible, stable, enabled and not
+covered before clicking, and retries when the SPA re-renders it under us.
+On the fa-plus and u3600_* checkout buttons those checks cost time at the one
+moment it matters. FAST_CLICK makes critical_click skip them:
+
+    FAST_CLICK=dom      dispatch a DOM click event once the element is attached
+    FAST_CLICK=input    send a real mouse event through CDP at the element's centre
+    (unset / false)     plain locator.click()
+
+Every fast click is verified: the step's effect (the next step's element
+appearing, or the clicked element going away) must show up within
+VERIFY_MS. If it doesn't, a normal locator.click() is sent as a fallback, but
+only when the click visibly went nowhere: no XHR/fetch left the page and the
+element is still attached and enabled. A slow server must not get the step
+twice, and the payment submit (retry=False) is never clicked again.
+
+Each click's latency is recorded per step and mode; print_click_report()
+shows them, so runs with and without FAST_CLICK can be compared step by step.
+"""
+import os
+import time
+
+from playwright.async_api import Error as AsyncError
+from playwright.async_api import TimeoutError as AsyncTimeoutError
+from playwright.sync_api import Error as PlaywrightError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+FAST_CLICK = os.getenv("FAST_CLICK", "false").lower()
+if FAST_CLICK in ("true", "1"):
+    FAST_CLICK = "dom"
+if FAST_CLICK not in ("dom", "input"):
+    FAST_CLICK = None
+VERIFY_MS = 1500
+
+# (label, mode, elapsed_ms) for every critical click in this process
+_clicks = []
+
+# The step took effect once effect_selector is attached (or, without one,
+# once the clicked element is gone or disabled)
+EFFECT_JS = """
+([effectSelector, clicked]) => {
+    if (effectSelector) {
+        return !!document.querySelector(effectSelector);
+    }
+    return !clicked || !clicked.isConnected || clicked.disabled;
+}
+"""
+
+# The clicked element can still take a click
+CLICKABLE_JS = "(el) => el.isConnected && !el.disabled"
+
+
+def _record(label, mode, start, end=None):
+    elapsed_ms = ((end or time.perf_counter()) - start) * 1000
+    _clicks.append((label, mode, elapsed_ms))
+    print(f"[CLICK] {label}: {elapsed_ms:.0f}ms ({mode})")
+
+
+def _took_effect(locator, effect_selector, handle):
+    try:
+        locator.page.wait_for_function(EFFECT_JS, arg=[effect_selector, handle], polling="raf", timeout=VERIFY_MS)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def _clickable(handle):
+    try:
+        return handle.evaluate(CLICKABLE_JS)
+    except PlaywrightError:
+        return False  # the document navigated away with it
+
+
+async def _clickable_async(handle):
+    try:
+        return await handle.evaluate(CLICKABLE_JS)
+    except AsyncError:
+        return False
+
+
+def _watch_requests(page):
+    """Collect the XHR/fetch requests sent from now on; call the returned stop() when done."""
+    sent = []
+
+    def on_request(request):
+        if request.resource_type in ("xhr", "fetch"):
+            sent.append(request.url)
+
+    page.on("request", on_request)
+    return sent, lambda: page.remove_listener("request", on_request)
+
+
+def critical_click(locator, label, effect_selector=None, timeout=10000, retry=True):
+    """Click locator on the critical path, fast if FAST_CLICK is set."""
+    start = time.perf_counter()
+    if FAST_CLICK is None:
+        locator.click(timeout=timeout)
+        return _record(label, "normal", start)
+
+    locator.wait_for(state="attached", timeout=timeout)
+    # Grab the element before clicking: a successful click may detach it
+    handle = locator.element_handle()
+    box = None
+    if FAST_CLICK == "input":
+        locator.scroll_into_view_if_needed(timeout=timeout)
+        box = locator.bounding_box()
+    requests, stop = _watch_requests(locator.page)
+    try:
+        if box is not None:
+            locator.page.mouse.click(box["x"] + box["width"] / 2, box["y"] + box["height"] / 2)
+        else:
+            locator.dispatch_event("click")
+        sent = time.perf_counter()
+        took_effect = _took_effect(locator, effect_selector, None if effect_selector else handle)
+    finally:
+        stop()
+
+    if took_effect:
+        # Only the dispatch itself counts, the verify wait is the step's own latency
+        return _record(label, FAST_CLICK, start, sent)
+    if not retry or requests or not _clickable(handle):
+        print(f"[CLICK] {label}: no effect within {VERIFY_MS}ms, not clicking again.")
+        return _record(label, FAST_CLICK, start, sent)
+    print(f"⚠️ [CLICK] {label}: fast click had no effect, retrying with a normal click...")
+    locator.click(timeout=timeout)
+    _record(label, "fallback", start)
+
+
+async def critical_click_async(locator, label, effect_selector=None, timeout=10000, retry=True):
+    start = time.perf_counter()
+    if FAST_CLICK is None:
+        await locator.click(timeout=timeout)
+        return _record(label, "normal", start)
+
+    await locator.wait_for(state="attached", timeout=timeout)
+    handle = await locator.element_handle()
+    box = None
+    if FAST_CLICK == "input":
+        await locator.scroll_into_view_if_needed(timeout=timeout)
+        box = await locator.bounding_box()
+    requests, stop = _watch_requests(locator.page)
+    try:
+        if box is not None:
+            await locator.page.mouse.click(box["x"] + box["width"] / 2, box["y"] + box["height"] / 2)
+        else:
+            await locator.dispatch_event("click")
+        sent = time.perf_counter()
+        try:
+            await locator.page.wait_for_function(
+                EFFECT_JS, arg=[effect_selector, None if effect_selector else handle], polling="raf", timeout=VERIFY_MS
+            )
+            return _record(label, FAST_CLICK, start, sent)
+        except AsyncTimeoutError:
+            pass
+    finally:
+        stop()
+
+    if not retry or requests or not await _clickable_async(handle):
+        print(f"[CLICK] {label}: no effect within {VERIFY_MS}ms, not clicking again.")
+        return _record(label, FAST_CLICK, start, sent)
+    print(f"⚠️ [CLICK] {label}: fast click had no effect, retrying with a normal click...")
+    await locator.click(timeout=timeout)
+    _record(label, "fallback", start)
+
+
+def print_click_report():
+    """Average click latency per step and mode."""
+    by_step = {}
+    for label, mode, elapsed in _clicks:
+        by_step.setdefault((label, mode), []).append(elapsed)
+    for (label, mode), times in by_step.items():
+        print(f"[CLICK] {label} ({mode}): {sum(times) / len(times):.0f}ms avg over {len(times)}")
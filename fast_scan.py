@@ -0,0 +1,422 @@
+"""
+Fast result-table helpers shared by the final_booking_*.py scripts.
+
+Everything here talks to div#searchResult with as few Python <-> browser
+round trips as possible: one page.evaluate per results page instead of one
+inner_text() call per row per priority slot.
+"""
+import time
+import weakref
+
+from claim_ledger import ClaimPicker
+from fast_click import critical_click
+from slot_model import SlotIndex, SlotRow
+
+# 1-based 'Quand' column index, cached across pages and retries.
+# None until the first successful header scan.
+_quand_index = None
+
+EXTRACT_ROWS_JS = """
+(cachedIndex) => {
+    const root = document.querySelector("div#searchResult");
+    if (!root) {
+        return null;
+    }
+
+    // Re-use the cached 'Quand' column if its header still says so
+    const headers = Array.from(root.querySelectorAll("thead tr th"));
+    const isQuand = (th) => th && th.innerText.trim().toLowerCase().includes("quand");
+    let quandIndex = null;
+    if (cachedIndex && isQuand(headers[cachedIndex - 1])) {
+        quandIndex = cachedIndex;
+    } else {
+        const i = headers.findIndex(isQuand);
+        quandIndex = i >= 0 ? i + 1 : null;
+    }
+
+    const facilityIndex = headers.findIndex((th) => /lieu|site|installation|endroit|emplacement/i.test(th.innerText)) + 1;
+
+    const rows = [];
+    if (quandIndex !== null) {
+        root.querySelectorAll("tbody tr").forEach((tr, index) => {
+            const cell = tr.querySelector(`td:nth-child(${quandIndex})`);
+            const facilityCell = facilityIndex ? tr.querySelector(`td:nth-child(${facilityIndex})`) : null;
+            rows.push({
+                index: index,
+                quand: cell ? cell.innerText.trim() : "",
+                facility: facilityCell ? facilityCell.innerText.trim() : null,
+                hasButton: !!tr.querySelector("button i.fa-plus"),
+            });
+        });
+    }
+
+    const nextLi = document.querySelector("li.pagination-next");
+    return {
+        quandIndex: quandIndex,
+        rows: rows,
+        hasPagination: !!nextLi,
+        hasNext: !!nextLi && !(nextLi.className || "").includes("disabled"),
+    };
+}
+"""
+
+
+def reset_quand_cache():
+    global _quand_index
+    _quand_index = None
+
+
+# The same cache per page, for the async pipeline where every page renders
+# its own table; entries go away with their closed pages
+_quand_by_page = weakref.WeakKeyDictionary()
+
+
+def page_quand_index(page):
+    """Cached 'Quand' column of page's result table (argument for EXTRACT_ROWS_JS), or None."""
+    return _quand_by_page.get(page)
+
+
+def remember_quand_index(page, result):
+    """Cache the 'Quand' column of an EXTRACT_ROWS_JS result for page."""
+    if result and result["quandIndex"] is not None:
+        _quand_by_page[page] = result["quandIndex"]
+
+
+def extract_rows(page):
+    """
+    Pull every row of div#searchResult in a single page.evaluate call.
+
+    Returns a dict like:
+    {
+      "quandIndex": 3,
+      "rows": [{"index": 0, "quand": "2025-07-24 19:00 - 20:00", "facility": "...", "hasButton": true}, ...],
+      "hasPagination": true,
+      "hasNext": false
+    }
+    or None if the result table is not on the page.
+    """
+    global _quand_index
+    result = page.evaluate(EXTRACT_ROWS_JS, _quand_index)
+    if result and result["quandIndex"] is not None:
+        _quand_index = result["quandIndex"]
+    return result
+
+
+def bookable(rows):
+    """Rows that have a fa-plus button; listed-but-unbookable rows are not occurrences."""
+    return [row for row in rows if row["hasButton"]]
+
+
+def match_rows(rows, priority_slots, target_date):
+    """
+    Match all priority slots against the extracted rows.
+
+    Rows are parsed once into a SlotIndex, so each priority slot is a single
+    lookup on (date, start). Yields (priority, slot, row) in the same order
+    the per-row scan used to visit them: priority first, then row order.
+    """
+    index = SlotIndex()
+    unparsed = []
+    for row in rows:
+        slot_row = SlotRow.parse(row["quand"], index=row["index"], facility=row.get("facility"))
+        if slot_row is None:
+            unparsed.append(row)
+        else:
+            index.add(slot_row)
+
+    by_index = {row["index"]: row for row in rows}
+    for priority, slot in enumerate(priority_slots, 1):
+        hits = [by_index[slot_row.index] for slot_row in index.lookup(slot, target_date)]
+        # ✅ Rows we can't parse keep the old rule: BOTH the time slot and the target date
+        hits += [row for row in unparsed if slot in row["quand"] and target_date in row["quand"]]
+        hits.sort(key=lambda row: row["index"])
+        for row in hits:
+            yield priority, slot, row
+
+
+def row_button(page, row_index):
+    return page.locator("div#searchResult tbody tr").nth(row_index).locator("button:has(i.fa-plus)")
+
+
+# Rendered once a row is in the cart
+CART_OPENED = "button#u3600_btnSelect0"
+
+
+def add_to_cart(page, row_index):
+    """Click a row's fa-plus button (FAST_CLICK aware)."""
+    critical_click(row_button(page, row_index), "add to cart", CART_OPENED)
+
+
+# In-page scan-and-click helper, installed with context.add_init_script so it
+# exists on every navigation. It runs the whole try_find_slot decision inside
+# the page (slot + date match, first/second occurrence rule, pagination) and
+# clicks the fa-plus button itself the instant the wanted match is found.
+INPAGE_SCAN_JS = """
+(() => {
+    if (window.__pbScanAndClick) {
+        return;
+    }
+
+    const quandColumn = (root) => {
+        const headers = Array.from(root.querySelectorAll("thead tr th"));
+        const i = headers.findIndex((th) => th.innerText.trim().toLowerCase().includes("quand"));
+        return i >= 0 ? i + 1 : null;
+    };
+
+    // Resolve once the result body differs from `before` (or on timeout)
+    const waitForNewPage = (before, timeoutMs) => new Promise((resolve) => {
+        const bodyText = () => {
+            const tbody = document.querySelector("div#searchResult tbody");
+            return tbody ? tbody.innerText : "";
+        };
+        if (bodyText() !== before) {
+            return resolve(true);
+        }
+        const observer = new MutationObserver(() => {
+            if (bodyText() !== before) {
+                observer.disconnect();
+                clearTimeout(timer);
+                resolve(true);
+            }
+        });
+        const timer = setTimeout(() => {
+            observer.disconnect();
+            resolve(false);
+        }, timeoutMs);
+        observer.observe(document.body, { childList: true, subtree: true, characterData: true });
+    });
+
+    window.__pbScanAndClick = async ({ slots, targetDate, preferSecond, pageTimeoutMs }) => {
+        const wanted = preferSecond ? 2 : 1;
+        const matches = [];
+        let pageNo = 1;
+
+        while (true) {
+            const root = document.querySelector("div#searchResult");
+            if (!root) {
+                return { status: "no-table", matches: matches, pages: pageNo };
+            }
+            const quandIndex = quandColumn(root);
+            if (quandIndex === null) {
+                return { status: "no-quand", matches: matches, pages: pageNo };
+            }
+
+            const rows = Array.from(root.querySelectorAll("tbody tr"));
+            const texts = rows.map((tr) => {
+                const cell = tr.querySelector(`td:nth-child(${quandIndex})`);
+                return cell ? cell.innerText.trim() : "";
+            });
+
+            for (let p = 0; p < slots.length; p++) {
+                for (let i = 0; i < rows.length; i++) {
+                    if (!(texts[i].includes(slots[p]) && texts[i].includes(targetDate))) {
+                        continue;
+                    }
+                    // Like bookable(): a listed row without fa-plus is not an occurrence
+                    const button = Array.from(rows[i].querySelectorAll("button"))
+                        .find((b) => b.querySelector("i.fa-plus"));
+                    if (!button) {
+                        continue;
+                    }
+                    matches.push({ slot: slots[p], priority: p + 1, row: i, page: pageNo });
+                    if (matches.length === wanted) {
+                        button.click();
+                        return { status: "clicked", matches: matches, pages: pageNo };
+                    }
+                }
+            }
+
+            const nextLi = document.querySelector("li.pagination-next");
+            if (!nextLi || (nextLi.className || "").includes("disabled")) {
+                return { status: "none", matches: matches, pages: pageNo };
+            }
+            const links = Array.from(nextLi.querySelectorAll("a.ng-binding"));
+            const link = links.find((a) => a.innerText.includes(">")) || nextLi.querySelector("a");
+            const tbody = root.querySelector("tbody");
+            const before = tbody ? tbody.innerText : "";
+            link.click();
+            if (!(await waitForNewPage(before, pageTimeoutMs))) {
+                return { status: "page-timeout", matches: matches, pages: pageNo };
+            }
+            pageNo += 1;
+        }
+    };
+})();
+"""
+
+
+def install_inpage_scanner(context):
+    """
+    Register the in-page scan-and-click helper for every page of the context.
+    Must be called before the first page.goto so the helper is already there.
+    """
+    context.add_init_script(INPAGE_SCAN_JS)
+
+
+def try_find_slot_inpage(page, priority_slots, target_date, prefer_second=False, page_timeout_ms=5000):
+    """
+    Same rules as try_find_slot, but the scan, pagination and fa-plus click all
+    happen inside the page in one evaluate call. Returns the booked slot or None.
+    """
+    print("[SCAN] Scanning for priority slots in-page (with pagination)...")
+    page.wait_for_selector("div#searchResult")
+
+    # The helper guards against double install, so re-running it here covers
+    # pages opened before install_inpage_scanner() at no extra round trip
+    result = page.evaluate(
+        "opts => {" + INPAGE_SCAN_JS + " return window.__pbScanAndClick(opts); }",
+        {
+            "slots": priority_slots,
+            "targetDate": target_date,
+            "preferSecond": prefer_second,
+            "pageTimeoutMs": page_timeout_ms,
+        },
+    )
+
+    for n, match in enumerate(result["matches"], 1):
+        print(f"🔍 Found match #{n}: [{target_date}] '{match['slot']}' at row {match['row']+1} (page {match['page']})")
+
+    status = result["status"]
+    if status == "clicked":
+        match = result["matches"][-1]
+        label = "SECOND" if prefer_second else "FIRST"
+        script = "B" if prefer_second else "A"
+        print(f"✅ [P{match['priority']}] Script {script} booked {label} occurrence '{match['slot']}' in-page")
+        return match["slot"]
+
+    if status == "no-quand":
+        print("❌ 'Quand' column not found.")
+    elif status == "page-timeout":
+        print(f"⛔ Next page did not render within {page_timeout_ms}ms.")
+    elif prefer_second:
+        print("⛔ Fewer than 2 total matches found for the target date — Script B will skip.")
+    else:
+        print("⛔ No matches found for the target date — Script A will skip.")
+    return None
+
+
+# MutationObserver that pushes a fresh snapshot of div#searchResult to Python
+# (through the __pbRowsChanged binding) at most once per animation frame,
+# whenever rows are added to or changed inside the result table.
+WATCH_ROWS_JS = """
+(() => {
+    if (window.__pbWatchInstalled) {
+        return;
+    }
+    window.__pbWatchInstalled = true;
+
+    const extract = """ + EXTRACT_ROWS_JS + """;
+    let scheduled = false;
+
+    const push = () => {
+        scheduled = false;
+        const snapshot = extract(null);
+        if (snapshot && snapshot.quandIndex !== null) {
+            window.__pbRowsChanged(snapshot);
+        }
+    };
+
+    const observer = new MutationObserver((mutations) => {
+        const root = document.querySelector("div#searchResult");
+        if (!root || scheduled) {
+            return;
+        }
+        if (mutations.some((m) => root.contains(m.target) || m.target.contains(root))) {
+            scheduled = true;
+            requestAnimationFrame(push);
+        }
+    });
+
+    const start = () => observer.observe(document.documentElement, {
+        childList: true,
+        subtree: true,
+        characterData: true,
+    });
+    if (document.documentElement) {
+        start();
+    } else {
+        document.addEventListener("DOMContentLoaded", start);
+    }
+})();
+"""
+
+
+class RowWatcher:
+    """
+    Receives result-table snapshots pushed from the page by WATCH_ROWS_JS.
+
+    The sync API only dispatches binding calls while Python is inside a
+    Playwright call, so wait_for_rows() pumps the connection with very short
+    waits; a push is handled within a frame of the SPA rendering it.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.version = 0
+        self.page = None  # only pushes from this page count, see watch()
+
+    def install(self, context):
+        context.expose_binding("__pbRowsChanged", self._on_rows)
+        context.add_init_script(WATCH_ROWS_JS)
+
+    def watch(self, page):
+        """Follow page; the binding is context-wide, so other tabs' pushes are ignored."""
+        self.page = page
+
+    def _on_rows(self, source, snapshot):
+        if source["page"] is not self.page:
+            return
+        self.snapshot = snapshot
+        self.version += 1
+
+    def wait_for_rows(self, page, since_version, timeout_ms, pump_ms=10):
+        """
+        Block until a snapshot newer than since_version arrives.
+        Returns the snapshot, or None on timeout.
+        """
+        deadline = time.monotonic() + timeout_ms / 1000
+        while self.version == since_version:
+            if time.monotonic() >= deadline:
+                return None
+            page.wait_for_timeout(pump_ms)
+        return self.snapshot
+
+
+def try_find_slot_watched(page, watcher, since_version, priority_slots, target_date,
+                          prefer_second=False, timeout_ms=5000, ledger=None, account=None):
+    """
+    React to pushed snapshots of the current results page instead of sleeping
+    and re-reading it. Every push is matched with the same first/second
+    occurrence rule (or claim ledger) as try_find_slot.
+
+    Returns (slot, snapshot): slot is the booked slot or None; snapshot is the
+    last pushed table (None if nothing rendered) so the caller can fall back to
+    a paginated try_find_slot when snapshot["hasNext"] is set.
+    """
+    print("[WATCH] Waiting for result rows...")
+    deadline = time.monotonic() + timeout_ms / 1000
+    version = since_version
+    snapshot = None
+
+    while True:
+        remaining_ms = (deadline - time.monotonic()) * 1000
+        if remaining_ms <= 0:
+            break
+        pushed = watcher.wait_for_rows(page, version, remaining_ms)
+        if pushed is None:
+            break
+        snapshot, version = pushed, watcher.version
+
+        picker = ClaimPicker(prefer_second, ledger, account)
+        for priority, slot, row in match_rows(bookable(snapshot["rows"]), priority_slots, target_date):
+            if picker.take(target_date, slot, row.get("facility")):
+                print(f"✅ [P{priority}] Watcher booking '{slot}' at row {row['index']+1}")
+                add_to_cart(page, row["index"])
+                return slot, snapshot
+        if snapshot["hasNext"]:
+            # Not on this page; let the caller paginate right away
+            break
+
+    if snapshot is None:
+        print("⛔ No result rows rendered before the watch timeout.")
+    return None, snapshot
@@ -5,7 +5,45 @@ from datetime import datetime, timedelta
 from playwright.sync_api import sync_playwright
 from zoneinfo import ZoneInfo
 
-RETRIES = 40
+from api_booking import API_BOOKING, API_RECORD, ApiBooker, ApiRecorder
+from armed import ARMED, release_instant, wait_for_release
+from boroughs import BOROUGHS, borough_pages, select_borough, try_find_slot_boroughs
+from checkout_pipeline import PIPELINED_CHECKOUT, prepare_cart_tab, run_checkout_pipeline, select_other_users
+from claim_ledger import ClaimPicker, make_ledger, release_all
+from conflict import checkout_with_recovery, remember_candidates, watch_cart_errors
+from fast_click import critical_click, print_click_report
+from fast_scan import (
+    RowWatcher,
+    add_to_cart,
+    bookable,
+    extract_rows,
+    install_inpage_scanner,
+    match_rows,
+    try_find_slot_inpage,
+    try_find_slot_watched,
+)
+from http_probe import HTTP_PROBE, HttpProbe
+from lean_profile import apply_lean_routes, context_options, launch_browser
+from multi_cart import MAX_CART_ROWS, fill_cart
+from page_fanout import PAGE_FANOUT, prepare_tabs, try_find_slot_fanout
+from poll_schedule import make_schedule
+from readiness import (
+    click_and_wait_for_table,
+    print_wait_report,
+    run_and_wait_for_search,
+    wait_for_step,
+    wait_for_visible,
+)
+from row_index import PRE_INDEX, build_row_index, try_find_slot_indexed
+from xhr_results import install_response_listener, try_find_slot_xhr
+
+STORAGE_STATE = "ricky.json"
+ACCOUNT = os.path.splitext(STORAGE_STATE)[0]
+LEDGER = make_ledger()  # CLAIM_LEDGER: claim rows across bookers instead of first/second occurrence
+RETRIES = 40  # attempts for POLL_SCHEDULE=fixed
+SCAN_MODE = os.getenv("SCAN_MODE", "batched").lower()  # "batched", "inpage" (scan + click inside the page) or "xhr" (parse the search response)
+WATCH_ROWS = os.getenv("WATCH_ROWS", "false").lower() == "true"  # react to MutationObserver pushes instead of fixed sleeps
+FAST_REFRESH = os.getenv("FAST_REFRESH", "true").lower() == "true"  # re-trigger the search in place on later retries
 
 MTL = ZoneInfo("America/Toronto")
 GRACE_MIN = 10  # minutes after the hour to keep targeting the previous release window
@@ -61,84 +99,107 @@ def get_tomorrows_date_str():
     return (today_mtl() + timedelta(days=1)).strftime("%Y-%m-%d")
 
 
-def run_search(page, date_str):
-    page.goto("https://loisirs.montreal.ca/IC3/#/U6510/search")
-    page.wait_for_timeout(1000)
+def run_search(page, date_str, wait_results=True, borough=None):
+    page.goto("https://loisirs.montreal.ca/IC3/#/U6510/search", wait_until="domcontentloaded")
+    wait_for_visible(page, "input#u6510_edSearch", "search page")
 
     print("[UI] Setting filters...")
     page.locator("input#u6510_edSearch").fill("pickleball")
-    page.locator("button#u6510_btnTreeBorough").click()
-    page.wait_for_timeout(500)
+    select_borough(page, borough or BOROUGHS[0])
 
-    # ✅ Only select Saint-Leonard if not already checked
-    saint_leonard_checkbox = page.locator("input#u2000_chkValue11")
-    saint_leonard_checkbox.wait_for(state="visible")
-    if not saint_leonard_checkbox.is_checked():
-        saint_leonard_checkbox.click()
-
-    page.locator("button#u2000_btnTreeSelectConfirm").click()
+    date_input = page.locator("input[name='reserveDate']")
+    date_input.fill("")
+    if wait_results:
+        run_and_wait_for_search(page, lambda: date_input.fill(date_str))
+    else:
+        date_input.fill(date_str)
+
+SEARCH_STATE_JS = """
+() => {
+    const keyword = document.querySelector("input#u6510_edSearch");
+    return {
+        onSearch: location.hash.includes("/U6510/search"),
+        keyword: keyword ? keyword.value.trim().toLowerCase() : null,
+        hasDate: !!document.querySelector("input[name='reserveDate']"),
+        hasResults: !!document.querySelector("div#searchResult"),
+    };
+}
+"""
+
+def refresh_search(page, date_str, wait_results=True):
+    """
+    Re-trigger the search on the already-filtered page by toggling the date,
+    instead of page.goto + re-applying every filter.
+    Returns False if the page has gone stale and needs a full run_search.
+    """
+    state = page.evaluate(SEARCH_STATE_JS)
+    if not (state["onSearch"] and state["keyword"] == "pickleball" and state["hasDate"] and state["hasResults"]):
+        print("[UI] Search page is stale, doing a full reload...")
+        return False
 
+    print("[UI] Refreshing search in place...")
     date_input = page.locator("input[name='reserveDate']")
     date_input.fill("")
-    date_input.fill(date_str)
-    page.wait_for_timeout(2000)
+    if wait_results:
+        run_and_wait_for_search(page, lambda: date_input.fill(date_str))
+    else:
+        date_input.fill(date_str)
+    return True
 
 def try_find_slot(page, priority_slots, target_date, prefer_second=False):
     """
     Only consider rows that match BOTH the target time slot and the target_date (YYYY-MM-DD).
     """
+    if SCAN_MODE == "inpage":
+        return try_find_slot_inpage(page, priority_slots, target_date, prefer_second=prefer_second)
+    if SCAN_MODE == "xhr":
+        handled, slot = try_find_slot_xhr(
+            page, priority_slots, target_date, prefer_second=prefer_second, ledger=LEDGER, account=ACCOUNT
+        )
+        if handled:
+            return slot
+        print("↩️ Falling back to scanning the result table...")
+
     print("[SCAN] Scanning for priority slots (with pagination)...")
     matched = 0
+    picker = ClaimPicker(prefer_second, LEDGER, ACCOUNT)
 
     while True:
         page.wait_for_selector("div#searchResult")
 
-        # find the 'Quand' column index
-        headers = page.locator("div#searchResult thead tr th")
-        quand_index = None
-        for i in range(headers.count()):
-            header_text = headers.nth(i).inner_text().strip().lower()
-            if "quand" in header_text:
-                quand_index = i + 1
-                break
-
-        if quand_index is None:
+        # one round trip: 'Quand' column index, every row's text and the pagination state
+        result = extract_rows(page)
+        if result is None or result["quandIndex"] is None:
             print("❌ 'Quand' column not found.")
             return None
 
-        rows = page.locator("div#searchResult tbody tr")
-
-        # Loop through rows and slots
-        for priority, slot in enumerate(priority_slots, 1):
-            for i in range(rows.count()):
-                cell = rows.nth(i).locator(f"td:nth-child({quand_index})")
-                cell_text = cell.inner_text().strip()
-
-                # ✅ Require BOTH the time slot and the target date
-                if slot in cell_text and target_date in cell_text:
-                    matched += 1
-                    print(f"🔍 Found match #{matched}: [{target_date}] '{slot}' at row {i+1}")
-
-                    if not prefer_second and matched == 1:
-                        print(f"✅ [P{priority}] Script A booking FIRST occurrence '{slot}'")
-                        rows.nth(i).locator("button:has(i.fa-plus)").click()
-                        return slot
+        # Match all priority slots against the extracted rows
+        matches = list(match_rows(bookable(result["rows"]), priority_slots, target_date))
+        for n, (priority, slot, row) in enumerate(matches):
+            i = row["index"]
+            matched += 1
+            print(f"🔍 Found match #{matched}: [{target_date}] '{slot}' at row {i+1}")
 
-                    if prefer_second and matched == 2:
-                        print(f"✅ [P{priority}] Script B booking SECOND occurrence '{slot}'")
-                        rows.nth(i).locator("button:has(i.fa-plus)").click()
-                        return slot
+            if not picker.take(target_date, slot, row.get("facility")):
+                continue
+            if LEDGER:
+                print(f"✅ [P{priority}] Booking claimed row '{slot}'")
+            elif prefer_second:
+                print(f"✅ [P{priority}] Script B booking SECOND occurrence '{slot}'")
+            else:
+                print(f"✅ [P{priority}] Script A booking FIRST occurrence '{slot}'")
+            add_to_cart(page, i)
+            remember_candidates(page, picker, target_date, matches[n + 1:])
+            return slot
 
         # pagination
-        next_li = page.locator("li.pagination-next")
-        if next_li.count() > 0:
-            li_class = next_li.first.get_attribute("class") or ""
-            if "disabled" in li_class:
+        if result["hasPagination"]:
+            if not result["hasNext"]:
                 print("⛔ Last page reached.")
                 break
             print("➡️ Moving to next page...")
-            next_li.locator("a.ng-binding", has_text=">").click()
-            page.wait_for_timeout(1500)
+            next_li = page.locator("li.pagination-next")
+            click_and_wait_for_table(page, next_li.locator("a.ng-binding", has_text=">"), "next page")
             continue
         else:
             break
@@ -149,6 +210,16 @@ def try_find_slot(page, priority_slots, target_date, prefer_second=False):
         print("⛔ No matches found for the target date — Script A will skip.")
     return None
 
+def try_find_slot_from_index(page, row_index, priority_slots, target_date, prefer_second=False):
+    """Book straight from the pre-release index, falling back to a fresh scan if it's stale."""
+    handled, slot = try_find_slot_indexed(page, row_index, prefer_second, LEDGER, ACCOUNT)
+    if handled:
+        return slot
+    print("↩️ Falling back to scanning the result table...")
+    if not refresh_search(page, target_date):
+        run_search(page, target_date)
+    return try_find_slot(page, priority_slots, target_date, prefer_second=prefer_second)
+
 def select_user_and_confirm(page):
     page.set_default_timeout(30000)  # safety timeout for all waits
 
@@ -157,7 +228,7 @@ def select_user_and_confirm(page):
     # Click directly (Playwright auto-waits for visible, enabled, stable, not covered)
     for attempt in range(2):  # retry once in case of detach
         try:
-            select_button.click(timeout=10000)
+            critical_click(select_button, "select user", timeout=10000)
             break
         except Exception as e:
             if "detached" in str(e).lower() and attempt == 0:
@@ -167,13 +238,13 @@ def select_user_and_confirm(page):
 
     print("[STEP] Confirming cart...")
     confirm_button = page.locator("button#u3600_btnCheckout0")
-    confirm_button.click(timeout=10000)
+    critical_click(confirm_button, "cart confirm", "button#u3600_btnCartShoppingCompleteStep", timeout=10000)
 
 def finalize_checkout(page):
     print("[STEP] Finalizing checkout...")
     complete_button = page.locator("button#u3600_btnCartShoppingCompleteStep")
     complete_button.wait_for(state="visible", timeout=5000)
-    complete_button.click()
+    critical_click(complete_button, "cart step", "#u3600_chkElectronicPaymentCondition")
     print("✅ Cart section confirmed.")
 
 def confirm_terms_and_submit(page):
@@ -191,10 +262,24 @@ def confirm_terms_and_submit(page):
 
     confirm_button = page.locator("button#u3600_btnCartPaymentCompleteStep")
     confirm_button.wait_for(state="visible", timeout=5000)
-    confirm_button.click()
+    critical_click(confirm_button, "payment step", retry=False)  # never submit the payment twice
 
     print("🎉 Reservation fully confirmed!")
 
+def checkout(page, mark_step, cart_size=1):
+    if PIPELINED_CHECKOUT:
+        return run_checkout_pipeline(page, mark_step, cart_size=cart_size)
+    wait_for_step(page, "button#u3600_btnSelect0", "user select ready")
+    mark_step("select_user")
+    select_user_and_confirm(page)
+    select_other_users(page, cart_size)
+    wait_for_step(page, "button#u3600_btnCartShoppingCompleteStep", "cart step ready")
+    mark_step("complete_cart")
+    finalize_checkout(page)
+    wait_for_step(page, "#u3600_chkElectronicPaymentCondition", "payment step ready")
+    mark_step("payment")
+    confirm_terms_and_submit(page)
+
 def main():
     # 🔑 Load slots from JSON, but filter to just the one relevant for this hour
     all_slots = load_priority_slots()
@@ -209,31 +294,134 @@ def main():
 
     with sync_playwright() as p:
         headless_mode = os.getenv("HEADLESS", "true").lower() == "true"
-        browser = p.chromium.launch(headless=headless_mode)
-        context = browser.new_context(storage_state="ricky.json")
+        browser = launch_browser(p, headless=headless_mode)
+        context = browser.new_context(storage_state=STORAGE_STATE, **context_options())
+        apply_lean_routes(context)
+        if SCAN_MODE == "inpage":
+            if LEDGER:
+                print("⚠️ [LEDGER] The in-page scanner clicks by itself and can't claim rows first.")
+            install_inpage_scanner(context)
+        watcher = None
+        if WATCH_ROWS:
+            watcher = RowWatcher()
+            watcher.install(context)
         page = context.new_page()
-
-        for attempt in range(RETRIES):
-            print(f"[{attempt+1}/{RETRIES}] Checking for time slots on {date_str}...")
+        if watcher:
+            watcher.watch(page)
+        watch_cart_errors(page)
+        if SCAN_MODE == "xhr":
+            install_response_listener(page)
+        probe = None
+        if HTTP_PROBE:
+            probe = HttpProbe(STORAGE_STATE)
+            probe.attach(page)
+        api_booker = ApiBooker.load(STORAGE_STATE) if API_BOOKING and probe else None
+        recorder = None
+        if API_RECORD:
+            recorder = ApiRecorder(STORAGE_STATE)
+            recorder.attach(page)
+        mark_step = recorder.mark if recorder else (lambda step: None)
+        if PIPELINED_CHECKOUT:
+            prepare_cart_tab(context)
+            page.bring_to_front()
+
+        row_index = None
+        if ARMED:
+            # Stage the filtered search page now, release only the search-and-book step
+            print("[ARMED] Staging search page ahead of the release...")
             run_search(page, date_str)
-
-            found_slot = try_find_slot(page, priority_slots, date_str, prefer_second=True)  # Script B → Second match
+            if PRE_INDEX and SCAN_MODE != "inpage":
+                row_index = build_row_index(page, priority_slots, date_str)
+            if len(BOROUGHS) > 1:
+                borough_pages(page, lambda tab, borough: run_search(tab, date_str, borough=borough))
+            elif PAGE_FANOUT:
+                prepare_tabs(page, lambda tab: run_search(tab, date_str))
+            wait_for_release(page, release_instant())
+        elif PRE_INDEX:
+            print("⚠️ [INDEX] PRE_INDEX needs ARMED=true to index before the release, ignoring.")
+
+        prefer_second = True  # Script B → Second match
+
+        schedule = make_schedule(release_instant().timestamp(), retries=RETRIES)
+        attempt = 0
+        while True:
+            print(f"[{schedule.describe()}] Checking for time slots on {date_str}...")
+            started = time.perf_counter()
+            found_slot = None
+            checkout_page = page  # BOROUGHS / PAGE_FANOUT may add the row in another tab
+            wanted = 2 if prefer_second and not LEDGER else 1
+            # Once the probe knows the search XHR, only wake the browser on a hit
+            if probe and probe.template and not probe.should_wake_browser(priority_slots, date_str, wanted=wanted):
+                print("[PROBE] No matching slot yet, browser stays idle.")
+            elif api_booker and probe.template and api_booker.try_book(
+                probe, date_str, ClaimPicker(prefer_second, LEDGER, ACCOUNT)
+            ):
+                break
+            else:
+                if api_booker:
+                    api_booker.discard_cart(page)
+                mark_step("search")
+                since_version = watcher.version if watcher else 0
+                # The index is only trusted for the first look after the release
+                use_index = row_index is not None and attempt == 0
+                # The watcher reacts to the render itself, so don't block on the XHR
+                wait_results = watcher is None or use_index
+                if not ((attempt > 0 or ARMED) and FAST_REFRESH and refresh_search(page, date_str, wait_results=wait_results)):
+                    run_search(page, date_str, wait_results=wait_results)
+
+                mark_step("add_to_cart")
+                if use_index:
+                    found_slot = try_find_slot_from_index(page, row_index, priority_slots, date_str, prefer_second)
+                elif len(BOROUGHS) > 1:
+                    found_slot, checkout_page = try_find_slot_boroughs(
+                        page, priority_slots, date_str, lambda tab, borough: run_search(tab, date_str, borough=borough),
+                        prefer_second=prefer_second, ledger=LEDGER, account=ACCOUNT,
+                    )
+                elif PAGE_FANOUT:
+                    found_slot, checkout_page = try_find_slot_fanout(
+                        page, priority_slots, date_str, lambda tab: run_search(tab, date_str),
+                        prefer_second=prefer_second, ledger=LEDGER, account=ACCOUNT,
+                    )
+                elif watcher:
+                    found_slot, snapshot = try_find_slot_watched(
+                        page, watcher, since_version, priority_slots, date_str, prefer_second=prefer_second,
+                        ledger=LEDGER, account=ACCOUNT,
+                    )
+                    # The watcher only sees the current results page
+                    if not found_slot and snapshot and snapshot["hasNext"]:
+                        found_slot = try_find_slot(page, priority_slots, date_str, prefer_second=prefer_second)
+                else:
+                    found_slot = try_find_slot(page, priority_slots, date_str, prefer_second=prefer_second)
             if found_slot:
                 print(f"🟢 Slot '{found_slot}' selected.")
-                page.wait_for_timeout(2000)
-                select_user_and_confirm(page)
-                page.wait_for_timeout(2000)
-                finalize_checkout(page)
-                page.wait_for_timeout(2000)
-                confirm_terms_and_submit(page)
+                try:
+                    extras = []
+                    if MAX_CART_ROWS > 1:
+                        extras = fill_cart(checkout_page, found_slot, all_slots, date_str, prefer_second, LEDGER, ACCOUNT)
+                    # A row lost mid-checkout moves on to the next candidate of this scan
+                    booked = checkout_with_recovery(
+                        checkout_page, found_slot, lambda target, cart_size: checkout(target, mark_step, cart_size), extras
+                    )
+                    found_slot = booked[0] if booked else None
+                except Exception:
+                    release_all(LEDGER, ACCOUNT)
+                    raise
+            if found_slot:
+                if recorder:
+                    recorder.save(found_slot, date_str, wanted=wanted)
                 break
-            else:
-                print("🔄 No available slot found. Retrying...")
-                time.sleep(3)
 
-        else:
-            print("❌ No priority slots found after retry window.")
+            schedule.observe(time.perf_counter() - started)
+            delay = schedule.next_delay()
+            if delay is None:
+                print("❌ No priority slots found after retry window.")
+                break
+            print("🔄 No available slot found. Retrying...")
+            time.sleep(delay)
+            attempt += 1
 
+        print_wait_report()
+        print_click_report()
         page.wait_for_timeout(5000)
         browser.close()
 
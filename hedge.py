@@ -0,0 +1,101 @@
+"""
+Hedged racing contexts for one account.
+
+A slow first page load (cold CDN, a GC pause on the runner) can make an
+account miss the release even when everything else is right. With HEDGE=true
+the async runners start HEDGE_RACERS contexts for the same account,
+HEDGE_STAGGER_MS apart, and race them through search and add-to-cart.
+
+All racers share one HedgeGate. Both contexts log into the same account, so
+they share one server-side cart and a second fa-plus would put a second row
+in it. A racer holds the gate from fa-plus until its cart opens
+(CART_OPENED): then it is the winner and the losers are cancelled (giving up
+their ledger claims). If the cart doesn't open, the racer loads the cart and
+only hands the gate back when its row isn't there; if the cart doesn't load
+either, the racer still counts as the winner, since a second row is worse
+than a failed checkout. Each racer waits
+its stagger right before its first search, which is after the release when
+ARMED has staged the pages, so the racers never all hit the server at once.
+"""
+import asyncio
+import os
+
+HEDGE = os.getenv("HEDGE", "false").lower() == "true"
+HEDGE_RACERS = int(os.getenv("HEDGE_RACERS", "2"))
+HEDGE_STAGGER_MS = int(os.getenv("HEDGE_STAGGER_MS", "400"))
+
+
+class HedgeGate:
+    """Lets exactly one racer of an account add to the cart at a time, and keeps the first that succeeds."""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.winner = None
+        self.won = asyncio.Event()
+
+    def ticket(self, racer, stagger=0):
+        return HedgeTicket(self, racer, stagger)
+
+
+class HedgeTicket:
+    """
+    One racer's pass: acquire() before fa-plus, then confirm() once the cart
+    opened or release() if the add failed. stagger is its start delay in seconds.
+    """
+
+    def __init__(self, gate, racer, stagger=0):
+        self.gate = gate
+        self.racer = racer
+        self.stagger = stagger
+
+    async def acquire(self):
+        """Wait for the gate. False if another racer already got its row into the cart."""
+        await self.gate.lock.acquire()
+        if self.gate.winner is None:
+            return True
+        self.gate.lock.release()
+        return False
+
+    def confirm(self):
+        self.gate.winner = self.racer
+        self.gate.won.set()
+        self.gate.lock.release()
+
+    def release(self):
+        self.gate.lock.release()
+
+
+async def hedged(run, log=print, racers=None, stagger_ms=None):
+    """
+    Race run(ticket, racer) over staggered racers and return the winner's
+    result (or None if no racer got a row into the cart).
+    """
+    racers = HEDGE_RACERS if racers is None else racers
+    stagger = (HEDGE_STAGGER_MS if stagger_ms is None else stagger_ms) / 1000
+    gate = HedgeGate()
+    tasks = [asyncio.create_task(run(gate.ticket(n, n * stagger), n)) for n in range(racers)]
+
+    async def cancel_losers():
+        await gate.won.wait()
+        log(f"🏁 [HEDGE] Racer {gate.winner + 1} has the cart, cancelling the others.")
+        for n, task in enumerate(tasks):
+            if n != gate.winner:
+                task.cancel()
+
+    canceller = asyncio.create_task(cancel_losers())
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        canceller.cancel()
+        for task in tasks:
+            task.cancel()
+
+    if gate.winner is not None:
+        result = results[gate.winner]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+    for n, result in enumerate(results):
+        if isinstance(result, Exception):
+            log(f"💥 [HEDGE] Racer {n + 1} failed: {result!r}")
+    return None
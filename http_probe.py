@@ -0,0 +1,198 @@
+"""
+HTTP-only availability probe.
+
+Rendering the whole IC3 SPA just to see whether a row appeared is the most
+expensive part of a retry. With HTTP_PROBE=true the first search runs in the
+browser as usual and the probe records the search XHR it fires (URL, method,
+headers, body). Next-page requests of the same search are not recorded, so
+the template always asks for the first results page. Later retries replay that request through a pooled
+keep-alive requests.Session carrying the account's storage-state cookies,
+and only wake the browser when the JSON response contains a matching slot.
+
+The IC3 response format isn't documented, so matching is deliberately loose:
+a result item matches when it mentions the target date and the slot's start
+time, unless one of its availability fields says it can't be booked
+(item_bookable, the JSON counterpart of fast_scan.bookable: rows are listed
+before they open, and those must not wake the browser every poll). Any probe
+failure counts as a possible hit so the browser path always gets the final say.
+"""
+import json
+import os
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_PROBE = os.getenv("HTTP_PROBE", "false").lower() == "true"
+
+# Headers that requests manages itself or that pin the recorded connection
+_SKIP_HEADERS = {"content-length", "host", "cookie", "connection", "accept-encoding"}
+
+# Query/body keys that only select a results page
+_PAGING_KEY = re.compile(r"^(page\w*|skip|offset|startindex|firstresult)$", re.IGNORECASE)
+
+# Availability fields of a result item: flags/counts, or a status text
+_TAKEN_KEY = re.compile(r"unavailable|indisponible|reserved|booked|full|complet|taken", re.IGNORECASE)
+_OPEN_KEY = re.compile(r"bookable|available|reservable|can_?book|can_?reserve|disponible|is_?open", re.IGNORECASE)
+_STATUS_KEY = re.compile(r"status|state|statut|etat|état|availability|disponibilit", re.IGNORECASE)
+_TAKEN_VALUE = re.compile(r"unavailable|indisponible|reserv|réserv|booked|full|complet|closed|fermé|taken", re.IGNORECASE)
+_OPEN_VALUE = re.compile(r"^(available|disponible|libre|open|ouvert|free)$", re.IGNORECASE)
+
+
+def session_from_storage_state(storage_state_path):
+    """A keep-alive requests.Session with the cookies of a Playwright storage-state file."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    with open(storage_state_path, "r") as f:
+        state = json.load(f)
+    for cookie in state.get("cookies", []):
+        session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain"),
+            path=cookie.get("path", "/"),
+        )
+    return session
+
+
+def is_search_request(request):
+    return request.resource_type in ("xhr", "fetch") and "search" in request.url.lower()
+
+
+def slot_start(slot):
+    """'19:00 - 20:00' -> '19:00'"""
+    return slot.split("-")[0].strip()
+
+
+def _result_items(payload):
+    """The largest list of objects in the response, i.e. the result rows."""
+    best = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            if len(node) > len(best) and all(isinstance(x, dict) for x in node):
+                best = node
+            stack.extend(node)
+    return best
+
+
+def _drop_paging(value):
+    if isinstance(value, dict):
+        return {k: _drop_paging(v) for k, v in value.items() if not _PAGING_KEY.match(k)}
+    if isinstance(value, list):
+        return [_drop_paging(v) for v in value]
+    return value
+
+
+def search_signature(template):
+    """The search a request runs with its paging parameters left out: equal for every page of one search."""
+    parts = urlsplit(template["url"])
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _PAGING_KEY.match(k))
+    url = urlunsplit(parts._replace(query=urlencode(query)))
+    body = template["body"]
+    try:
+        body = json.dumps(_drop_paging(json.loads(body)), sort_keys=True)
+    except (TypeError, ValueError):
+        if body and "=" in body:
+            body = sorted((k, v) for k, v in parse_qsl(body, keep_blank_values=True) if not _PAGING_KEY.match(k))
+    return template["method"], url, body
+
+
+def item_bookable(item):
+    """
+    False if one of item's availability fields says it can't be booked, True
+    if one says it can or there is none (the browser path decides then).
+    """
+    for key, value in item.items():
+        if isinstance(value, (bool, int, float)):
+            # Taken first: "unavailable" contains "available"
+            if _TAKEN_KEY.search(key):
+                return not value
+            if _OPEN_KEY.search(key):
+                return bool(value)
+        elif isinstance(value, str) and _STATUS_KEY.search(key):
+            if _TAKEN_VALUE.search(value):
+                return False
+            if _OPEN_VALUE.match(value.strip()):
+                return True
+    return True
+
+
+def item_matches(item_text, slot, target_date):
+    start = re.escape(slot_start(slot))
+    return target_date in item_text and re.search(rf"(^|[T\s\"']){start}", item_text) is not None
+
+
+class HttpProbe:
+    def __init__(self, storage_state_path):
+        self.session = session_from_storage_state(storage_state_path)
+        self.template = None
+        self.last_matches = []  # result items that matched on the last probe
+
+    def record(self, request):
+        """
+        page.on("request") listener: remember the first search XHR after a
+        filter or date change. Later pages of the same search (try_find_slot
+        pagination) would make the probe replay only the last results page.
+        """
+        if not is_search_request(request):
+            return
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in _SKIP_HEADERS}
+        template = {
+            "method": request.method,
+            "url": request.url,
+            "headers": headers,
+            "body": request.post_data,
+        }
+        if self.template is not None and search_signature(template) == search_signature(self.template):
+            return
+        self.template = template
+
+    def attach(self, page):
+        page.on("request", self.record)
+
+    def matching_items(self, priority_slots, target_date):
+        """
+        Result items matching a priority slot, in priority order, or None if
+        the probe could not tell (no template yet, HTTP error, non-JSON body).
+        """
+        if self.template is None:
+            return None
+        try:
+            response = self.session.request(
+                self.template["method"],
+                self.template["url"],
+                headers=self.template["headers"],
+                data=self.template["body"],
+                timeout=5,
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"⚠️ [PROBE] Search probe failed: {e}")
+            return None
+
+        items = [item for item in _result_items(payload) if item_bookable(item)]
+        texts = [json.dumps(item, ensure_ascii=False) for item in items]
+        matches = []
+        for slot in priority_slots:
+            for item, text in zip(items, texts):
+                if item_matches(text, slot, target_date):
+                    matches.append((slot, item))
+        return matches
+
+    def should_wake_browser(self, priority_slots, target_date, wanted=1):
+        matches = self.matching_items(priority_slots, target_date)
+        if matches is None:
+            self.last_matches = []
+            return True
+        self.last_matches = matches
+        print(f"[PROBE] {len(matches)} matching row(s) in the search response")
+        return len(matches) >= wanted
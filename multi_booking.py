@@ -0,0 +1,128 @@
+"""
+Multi-account booking runner.
+
+Runs every account from accounts.json in a single Chromium process: one
+browser, one isolated new_context(storage_state=...) per account, all booking
+concurrently on one event loop through the async pipeline in async_booking.py.
+Adding an account is a new entry in accounts.json instead of another
+final_booking_*.py copy and another VM.
+
+Honours the same HEADLESS, SLOT_TARGET, ARMED, SCAN_MODE, FAST_REFRESH,
+LEAN_PROFILE, POLL_SCHEDULE, HTTP_PROBE and CLAIM_LEDGER environment variables as the final_booking_*.py
+scripts, plus HEDGE (see hedge.py). SHARED_SCANNER=true swaps the per-account search loops for one
+scanner page feeding every account (see shared_scanner.py).
+"""
+import asyncio
+import os
+import tempfile
+
+from playwright.async_api import async_playwright
+
+from accounts import get_target_slot, get_tomorrows_date_str, load_accounts, load_priority_slots
+from armed import ARMED, release_instant
+from async_booking import book_account, release_when_ready, set_account
+from claim_ledger import make_ledger
+from fast_click import print_click_report
+from lean_profile import apply_lean_routes_async, context_options, launch_browser
+from readiness import print_wait_report
+from shared_scanner import SHARED_SCANNER, RowFeed, run_booker, run_scanner
+
+
+async def scan_for_all(browser, storage_state, date_str, release_epoch, feed, done, released):
+    set_account("scanner")
+    context = await browser.new_context(storage_state=storage_state, **context_options())
+    await apply_lean_routes_async(context)
+    page = await context.new_page()
+    try:
+        await run_scanner(page, date_str, release_epoch, feed, done, released)
+    finally:
+        await context.close()
+
+
+async def book_from_feed(browser, account, feed, queue, priority_slots, date_str, ledger):
+    set_account(account["name"])
+    context = await browser.new_context(storage_state=account["storage_state"], **context_options())
+    await apply_lean_routes_async(context)
+    page = await context.new_page()
+    try:
+        return await run_booker(
+            page, feed, queue, account["name"], priority_slots, date_str, ledger, account.get("prefer_second", False)
+        )
+    finally:
+        await context.close()
+
+
+async def run_all(runs, date_str, ledger):
+    """Book every (account, priority_slots) of runs in one browser."""
+    release_at = release_instant()
+    released = asyncio.Event() if ARMED else None
+
+    async with async_playwright() as p:
+        headless_mode = os.getenv("HEADLESS", "true").lower() == "true"
+        browser = await launch_browser(p, headless=headless_mode)
+
+        scanner = None
+        if SHARED_SCANNER:
+            feed = RowFeed()
+            done = asyncio.Event()
+            tasks = [
+                book_from_feed(browser, account, feed, feed.subscribe(), priority_slots, date_str, ledger)
+                for account, priority_slots in runs
+            ]
+            scanner = asyncio.ensure_future(
+                scan_for_all(browser, runs[0][0]["storage_state"], date_str, release_at.timestamp(), feed, done, released)
+            )
+        else:
+            tasks = [
+                book_account(browser, account, priority_slots, date_str, release_at.timestamp(), released, ledger)
+                for account, priority_slots in runs
+            ]
+        if released is not None:
+            tasks.append(release_when_ready(release_at, released))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if scanner is not None:
+            # Every booker is finished, so the scanner has no one left to feed
+            done.set()
+            await asyncio.gather(scanner, return_exceptions=True)
+
+        for (account, _), result in zip(runs, results):
+            if isinstance(result, Exception):
+                print(f"💥 [{account['name']}] Failed: {result!r}")
+            elif result:
+                print(f"🏓 [{account['name']}] Booked '{result}'")
+            else:
+                print(f"➖ [{account['name']}] Nothing booked")
+
+        print_wait_report()
+        print_click_report()
+        await browser.close()
+
+
+async def main():
+    all_slots = load_priority_slots()
+    date_str = get_tomorrows_date_str()
+
+    runs = []
+    for account in load_accounts():
+        priority_slots = get_target_slot(account, all_slots)
+        if priority_slots:
+            print(f"🎯 [{account['name']}] Target slot for this run: {priority_slots[0]} (for tomorrow)")
+            runs.append((account, priority_slots))
+        else:
+            print(f"⏭️ [{account['name']}] No target slot for this run, skipping.")
+    if not runs:
+        print("❌ No account has a target slot for this run, exiting.")
+        return
+
+    ledger = make_ledger()
+    if ledger is not None:
+        await run_all(runs, date_str, ledger)
+        return
+    # All accounts share this process, so fall back to a per-run SQLite ledger,
+    # deleted with its directory when the run ends
+    with tempfile.TemporaryDirectory(prefix="pickleball_claims_") as tmp:
+        await run_all(runs, date_str, make_ledger(os.path.join(tmp, "claims.db")))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
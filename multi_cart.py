@@ -0,0 +1,101 @@
+"""
+Multi-slot cart: book consecutive hours in one checkout.
+
+slots.json usually lists consecutive hours ("19:00 - 20:00" ... "22:00 - 23:00")
+but each run books one of them, and every extra hour costs a full checkout of
+its own. With MAX_CART_ROWS=N (N > 1), once the target row is in the cart
+fill_cart goes back to the result table and adds the hours adjacent to it,
+picked in slots.json priority order, until the block holds N slots, the next
+hour has no bookable row, or the site refuses another item (the per-account
+limit, caught from its message or after EXTRA_LINE_TIMEOUT_MS: the first row
+is waiting in the cart meanwhile). The payment flow then runs once for the
+whole cart.
+
+Extra rows go through the same claim / first-second occurrence rule as the
+first one, one ClaimPicker per slot. The pickers go along with the slots to
+checkout_with_recovery, which releases the claim of any extra line lost
+mid-checkout and keeps the others.
+"""
+import os
+
+from checkout_pipeline import CART_URL
+from claim_ledger import ClaimPicker
+from conflict import back_to_results
+from fast_scan import CART_OPENED, add_to_cart, bookable, extract_rows, match_rows
+from readiness import CART_LIMIT_TEXT, CONFLICT_TEXT, SlotConflict, wait_for_step
+from slot_model import parse_range
+
+MAX_CART_ROWS = int(os.getenv("MAX_CART_ROWS", "1"))
+EXTRA_LINE_TIMEOUT_MS = 3000
+
+
+def cart_slots(first_slot, all_slots, limit=None):
+    """
+    first_slot followed by the slots that extend it into one consecutive
+    block, earliest priority first, at most limit slots in all.
+    """
+    limit = MAX_CART_ROWS if limit is None else limit
+    block = [first_slot]
+    times = parse_range(first_slot)
+    if times is None:
+        return block
+    start, end = times
+    remaining = [slot for slot in all_slots if slot != first_slot]
+    while len(block) < limit:
+        for slot in remaining:
+            times = parse_range(slot)
+            if times and (times[0] == end or times[1] == start):
+                block.append(slot)
+                remaining.remove(slot)
+                start, end = min(start, times[0]), max(end, times[1])
+                break
+        else:
+            break
+    return block
+
+
+def _add_slot(page, slot, target_date, picker):
+    """Add the first bookable, claimable row for slot. Returns True if it reached the cart."""
+    result = extract_rows(page)
+    if result is None:
+        return False
+    for _, _, row in match_rows(bookable(result["rows"]), [slot], target_date):
+        if not picker.take(target_date, slot, row.get("facility")):
+            continue
+        print(f"🛒 [CART] Adding '{slot}' from row {row['index']+1}")
+        add_to_cart(page, row["index"])
+        try:
+            if wait_for_step(
+                page, CART_OPENED, "cart add", EXTRA_LINE_TIMEOUT_MS, f"{CONFLICT_TEXT}|{CART_LIMIT_TEXT}"
+            ):
+                return True
+            print(f"⚠️ [CART] '{slot}' didn't reach the cart within {EXTRA_LINE_TIMEOUT_MS}ms.")
+            return False
+        except SlotConflict as e:
+            print(f"⚠️ [CART] '{slot}' was refused: {e}")
+            picker.release()
+            return False
+    print(f"[CART] No bookable row for '{slot}'.")
+    return False
+
+
+def fill_cart(page, first_slot, all_slots, target_date, prefer_second=False, ledger=None, account=None):
+    """
+    With first_slot already in the cart, add its consecutive slots. Returns
+    the extra lines as (slot, picker), in cart order after first_slot.
+    """
+    extras = []
+    for slot in cart_slots(first_slot, all_slots)[1:]:
+        if not back_to_results(page):
+            break
+        picker = ClaimPicker(prefer_second, ledger, account)
+        if not _add_slot(page, slot, target_date, picker):
+            break
+        extras.append((slot, picker))
+
+    if page.locator(CART_OPENED).count() == 0:
+        print("[CART] Reopening the cart...")
+        page.goto(CART_URL, wait_until="domcontentloaded")
+    in_cart = [first_slot] + [slot for slot, _ in extras]
+    print(f"🛒 [CART] {len(in_cart)} slot(s) in the cart: {', '.join(in_cart)}")
+    return extras
@@ -0,0 +1,136 @@
+"""
+Parallel pagination fan-out.
+
+try_find_slot walks the results one page at a time through
+li.pagination-next, so a slot on page 3 costs two extra click-and-render
+round trips before it is even seen. With PAGE_FANOUT=true the page count is
+read from the numbered pagination links and pages 2..n are loaded in their
+own tabs of the same context: every tab re-runs the search at the same time,
+then jumps straight to its page number, and all pages are extracted
+together.
+
+Matches from every page are ranked by priority first (then page, then row),
+so a P1 slot on page 3 beats a P2 slot on page 1. The row is added to the
+cart in the tab that shows it and checkout carries on in that tab.
+
+Tabs are kept per main page and re-used across retries; ARMED runs open and
+stage them before the release with prepare_tabs.
+"""
+import os
+import re
+import time
+from contextlib import ExitStack
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from claim_ledger import ClaimPicker
+from fast_scan import EXTRACT_ROWS_JS, add_to_cart, bookable, extract_rows, match_rows
+from readiness import TABLE_CHANGED_JS, TBODY_TEXT_JS, is_search_response
+
+PAGE_FANOUT = os.getenv("PAGE_FANOUT", "false").lower() == "true"
+
+PAGE_LINKS_JS = """
+() => Array.from(document.querySelectorAll("ul.pagination li a"))
+    .map((a) => parseInt(a.innerText.trim(), 10))
+    .filter((n) => Number.isInteger(n))
+"""
+
+_tabs = {}  # main page -> [tab for results page 2, 3, ...]
+
+
+def page_count(page):
+    return max(page.evaluate(PAGE_LINKS_JS), default=1)
+
+
+def _tabs_for(page, count, stage):
+    tabs = _tabs.setdefault(page, [])
+    while len(tabs) < count:
+        tab = page.context.new_page()
+        stage(tab)
+        tabs.append(tab)
+    return tabs[:count]
+
+
+def prepare_tabs(page, stage):
+    """Open and stage one tab per extra results page ahead of time."""
+    count = page_count(page)
+    if count > 1:
+        print(f"[FANOUT] Staging {count - 1} tab(s) for results pages 2-{count}...")
+        _tabs_for(page, count - 1, stage)
+
+
+def refresh_all(tabs, date_str, timeout=10000):
+    """Re-run the search in every tab at once and wait for all the search XHRs."""
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for tab in tabs:
+                stack.enter_context(tab.expect_response(is_search_response, timeout=timeout))
+            for tab in tabs:
+                date_input = tab.locator("input[name='reserveDate']")
+                date_input.fill("")
+                date_input.fill(date_str)
+    except PlaywrightTimeoutError:
+        print("⚠️ [FANOUT] Not every tab got its search response.")
+    print(f"[WAIT] fan-out search x{len(tabs)}: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+def _goto_pages(tabs, timeout=5000):
+    """Click page 2, 3, ... in tabs[0], tabs[1], ... at once and wait for every table."""
+    befores = []
+    for page_no, tab in enumerate(tabs, 2):
+        befores.append(tab.evaluate(TBODY_TEXT_JS))
+        tab.locator("ul.pagination li a", has_text=re.compile(rf"^\s*{page_no}\s*$")).first.click()
+    for tab, before in zip(tabs, befores):
+        try:
+            tab.wait_for_function(TABLE_CHANGED_JS, arg=before, polling="raf", timeout=timeout)
+        except PlaywrightTimeoutError:
+            print("⚠️ [FANOUT] A results page did not render in time.")
+
+
+def try_find_slot_fanout(page, priority_slots, target_date, stage, prefer_second=False, ledger=None, account=None):
+    """
+    Scan every results page at once and take the best match by priority.
+    stage(tab) loads the filtered search page in a new tab.
+    Returns (slot, page the row was added on); slot is None if nothing was taken.
+    """
+    print("[SCAN] Scanning all result pages in parallel...")
+    page.wait_for_selector("div#searchResult")
+    first = extract_rows(page)
+    if first is None or first["quandIndex"] is None:
+        print("❌ 'Quand' column not found.")
+        return None, page
+
+    results = [(page, first)]
+    count = page_count(page) if first["hasPagination"] else 1
+    if count > 1:
+        tabs = _tabs_for(page, count - 1, stage)
+        print(f"[FANOUT] Loading pages 2-{count} in {len(tabs)} tab(s)...")
+        refresh_all(tabs, target_date)
+        _goto_pages(tabs)
+        for tab in tabs:
+            results.append((tab, tab.evaluate(EXTRACT_ROWS_JS, first["quandIndex"])))
+        last = results[-1][1]
+        if last and last["hasNext"]:
+            print(f"⚠️ [FANOUT] More pages than page links, only pages 1-{count} were scanned.")
+
+    candidates = []
+    for page_no, (tab, result) in enumerate(results, 1):
+        if result is None:
+            continue
+        for priority, slot, row in match_rows(bookable(result["rows"]), priority_slots, target_date):
+            candidates.append((priority, page_no, row["index"], slot, row, tab))
+    candidates.sort(key=lambda c: c[:3])
+
+    picker = ClaimPicker(prefer_second, ledger, account)
+    for n, (priority, page_no, i, slot, row, tab) in enumerate(candidates, 1):
+        print(f"🔍 Found match #{n}: [{target_date}] '{slot}' on page {page_no}, row {i+1}")
+        if picker.take(target_date, slot, row.get("facility")):
+            print(f"✅ [P{priority}] Booking '{slot}' from page {page_no}")
+            if tab is not page:
+                tab.bring_to_front()
+            add_to_cart(tab, i)
+            return slot, tab
+
+    print(f"⛔ No match could be taken across {len(results)} page(s).")
+    return None, page
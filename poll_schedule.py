@@ -0,0 +1,107 @@
+"""
+Polling schedules for the retry loop in main().
+
+A schedule decides how long to wait before the next search attempt, or
+returns None when the polling window is over. main() calls observe() with
+the duration of every attempt so a schedule can adapt to search latency.
+
+  FixedSchedule  - the old behaviour: RETRIES attempts, constant sleep
+  BurstSchedule  - back-to-back polling right around the release second,
+                   then staged back-off
+
+POLL_SCHEDULE=fixed selects the old behaviour.
+
+The release instant is a server-clock time, so BurstSchedule measures time
+since release on the server clock too (release_clock.server_now); with a
+skewed runner clock the burst would otherwise start early or be cut short.
+"""
+import os
+
+from release_clock import estimate_offset, offset_known, server_now
+
+POLL_SCHEDULE = os.getenv("POLL_SCHEDULE", "burst").lower()
+
+
+class FixedSchedule:
+    def __init__(self, retries=40, delay=3.0):
+        self.retries = retries
+        self.delay = delay
+        self.attempts = 0
+
+    def observe(self, latency):
+        self.attempts += 1
+
+    def next_delay(self):
+        if self.attempts >= self.retries:
+            return None
+        return self.delay
+
+    def describe(self):
+        return f"{self.attempts + 1}/{self.retries}"
+
+
+class BurstSchedule:
+    """
+    Start-to-start polling intervals by time since release:
+
+        until -5s                every 3s
+        -5s .. +10s              every 0.25s (effectively back-to-back)
+        +10s .. +30s             every 1s
+        +30s .. +90s             every 3s
+        +90s .. +180s            every 6s, then stop
+
+    The time spent in the search itself counts towards the interval, and if
+    searches get much slower than the first ones (the site is struggling)
+    the interval is stretched instead of piling more requests on.
+
+    A run started after the whole window has passed (e.g. a manual run)
+    treats its own start time as the release instant.
+    """
+
+    DEFAULT_STAGES = [(-5, 3.0), (10, 0.25), (30, 1.0), (90, 3.0), (180, 6.0)]
+    SLOWDOWN_RATIO = 2.0  # latency vs baseline before we back off harder
+
+    def __init__(self, release_epoch, stages=None, clock=server_now):
+        self.stages = stages or self.DEFAULT_STAGES
+        self.clock = clock
+        if clock() - release_epoch >= self.stages[-1][0]:
+            release_epoch = clock()
+        self.release_epoch = release_epoch
+        self.attempts = 0
+        self.baseline = None
+        self.latency = None
+        self.last = 0.0
+
+    def observe(self, latency):
+        self.attempts += 1
+        self.last = latency
+        if self.baseline is None:
+            self.baseline = latency
+        # Exponentially weighted moving average of recent attempts
+        self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+
+    def _stage_interval(self, since_release):
+        for until, interval in self.stages:
+            if since_release < until:
+                return interval
+        return None
+
+    def next_delay(self):
+        interval = self._stage_interval(self.clock() - self.release_epoch)
+        if interval is None:
+            return None
+        if self.baseline and self.latency > self.SLOWDOWN_RATIO * self.baseline:
+            interval *= self.latency / self.baseline
+        return max(0.0, interval - self.last)
+
+    def describe(self):
+        since = self.clock() - self.release_epoch
+        return f"#{self.attempts + 1}, release{since:+.1f}s"
+
+
+def make_schedule(release_epoch, retries=40):
+    if POLL_SCHEDULE == "fixed":
+        return FixedSchedule(retries=retries)
+    if not offset_known():
+        estimate_offset()  # ARMED runs already have one from the release wait
+    return BurstSchedule(release_epoch)
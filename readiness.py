@@ -0,0 +1,224 @@
+"""
+Readiness waits for the booking flow.
+
+Each helper blocks on a concrete signal (search XHR finished, result table
+re-rendered, element visible/enabled) instead of a fixed wait_for_timeout,
+and records how long it actually waited so runs can be compared against the
+old hard-coded sleeps with print_wait_report().
+"""
+import time
+
+from playwright.async_api import TimeoutError as AsyncTimeoutError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+# (label, elapsed_ms, ok) for every wait in this process
+_timings = []
+
+
+def _record(label, start, ok):
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _timings.append((label, elapsed_ms, ok))
+    print(f"[WAIT] {label}: {elapsed_ms:.0f}ms" + ("" if ok else " (timed out)"))
+    return ok
+
+
+def is_search_response(response):
+    """True for the XHR/fetch the search page fires when a filter changes."""
+    request = response.request
+    return request.resource_type in ("xhr", "fetch") and "search" in response.url.lower()
+
+
+def run_and_wait_for_search(page, action, label="search XHR", timeout=10000):
+    """
+    Run action (which triggers the search) and wait until the search XHR has
+    fully finished and the result table is attached.
+    """
+    start = time.perf_counter()
+    try:
+        with page.expect_response(is_search_response, timeout=timeout) as response_info:
+            action()
+        response_info.value.finished()
+        page.wait_for_selector("div#searchResult", state="attached", timeout=timeout)
+        ok = True
+    except PlaywrightTimeoutError:
+        ok = False
+    return _record(label, start, ok)
+
+
+TBODY_TEXT_JS = """
+() => {
+    const tbody = document.querySelector("div#searchResult tbody");
+    return tbody ? tbody.innerText : "";
+}
+"""
+
+TABLE_CHANGED_JS = """
+(before) => {
+    const tbody = document.querySelector("div#searchResult tbody");
+    return !!tbody && tbody.innerText !== before;
+}
+"""
+
+
+def click_and_wait_for_table(page, locator, label="table re-render", timeout=5000):
+    """Click locator (e.g. the next-page link) and wait for the result rows to change."""
+    before = page.evaluate(TBODY_TEXT_JS)
+    start = time.perf_counter()
+    locator.click()
+    try:
+        page.wait_for_function(TABLE_CHANGED_JS, arg=before, polling="raf", timeout=timeout)
+        ok = True
+    except PlaywrightTimeoutError:
+        ok = False
+    return _record(label, start, ok)
+
+
+ENABLED_JS = """
+(selector) => {
+    const el = document.querySelector(selector);
+    return !!el && !el.disabled && el.getClientRects().length > 0;
+}
+"""
+
+
+def wait_for_enabled(page, selector, label=None, timeout=10000):
+    """Wait until selector is rendered, visible and not disabled."""
+    start = time.perf_counter()
+    try:
+        page.wait_for_function(ENABLED_JS, arg=selector, polling="raf", timeout=timeout)
+        ok = True
+    except PlaywrightTimeoutError:
+        ok = False
+    return _record(label or f"{selector} enabled", start, ok)
+
+
+def wait_for_condition(page, script, arg=None, label="condition", timeout=5000):
+    """Wait until the page function script(arg) returns something truthy."""
+    start = time.perf_counter()
+    try:
+        page.wait_for_function(script, arg=arg, polling="raf", timeout=timeout)
+        ok = True
+    except PlaywrightTimeoutError:
+        ok = False
+    return _record(label, start, ok)
+
+
+def wait_for_visible(page, selector, label=None, timeout=10000):
+    start = time.perf_counter()
+    try:
+        page.locator(selector).first.wait_for(state="visible", timeout=timeout)
+        ok = True
+    except PlaywrightTimeoutError:
+        ok = False
+    return _record(label or f"{selector} visible", start, ok)
+
+
+# Pattern for cart/checkout errors meaning the row was taken by someone else.
+# Only those phrases: a generic "erreur" alert (session, payment) is not a conflict.
+CONFLICT_TEXT = (
+    r"plus disponible|n'est pas disponible|no longer available|not available"
+    r"|déjà réservée?|already (?:been )?(?:reserved|booked)"
+)
+
+# The site refusing another cart item (the per-account limit). Not a conflict
+# on a row, so only the cart-filling waits look for it.
+CART_LIMIT_TEXT = (
+    r"limite|nombre maximum|maximum de|ne pouvez plus|pas plus de|trop de"
+    r"|limit reached|maximum number|cannot add|can't add|too many"
+)
+
+STEP_OR_CONFLICT_JS = """
+([selector, pattern]) => {
+    const el = document.querySelector(selector);
+    if (el && !el.disabled && el.getClientRects().length > 0) {
+        return "ready";
+    }
+    const re = new RegExp(pattern, "i");
+    const alerts = document.querySelectorAll(".alert-danger, .alert-warning, .toast-error, .modal.in .modal-body, [role='alert']");
+    for (const alert of alerts) {
+        if (alert.getClientRects().length > 0 && re.test(alert.innerText)) {
+            return alert.innerText.trim();
+        }
+    }
+    return false;
+}
+"""
+
+
+class SlotConflict(Exception):
+    """The cart reported that the row was taken by someone else mid-checkout."""
+
+
+def wait_for_step(page, selector, label=None, timeout=10000, pattern=CONFLICT_TEXT):
+    """
+    wait_for_enabled for checkout steps: gives up the moment the cart shows an
+    error matching pattern instead of running into the timeout. Raises SlotConflict.
+    """
+    start = time.perf_counter()
+    try:
+        state = page.wait_for_function(
+            STEP_OR_CONFLICT_JS, arg=[selector, pattern], polling="raf", timeout=timeout
+        ).json_value()
+    except PlaywrightTimeoutError:
+        state = None
+    _record(label or f"{selector} enabled", start, state == "ready")
+    if state not in (None, "ready"):
+        raise SlotConflict(state)
+    return state == "ready"
+
+
+def print_wait_report():
+    if not _timings:
+        return
+    total_ms = sum(elapsed for _, elapsed, _ in _timings)
+    timeouts = sum(1 for _, _, ok in _timings if not ok)
+    print(f"[WAIT] {len(_timings)} readiness waits, {total_ms:.0f}ms total, {timeouts} timed out")
+
+
+# playwright.async_api versions of the waits above, sharing the same timings
+
+
+async def run_and_wait_for_search_async(page, action, label="search XHR", timeout=10000):
+    start = time.perf_counter()
+    try:
+        async with page.expect_response(is_search_response, timeout=timeout) as response_info:
+            await action()
+        response = await response_info.value
+        await response.finished()
+        await page.wait_for_selector("div#searchResult", state="attached", timeout=timeout)
+        ok = True
+    except AsyncTimeoutError:
+        ok = False
+    return _record(label, start, ok)
+
+
+async def click_and_wait_for_table_async(page, locator, label="table re-render", timeout=5000):
+    before = await page.evaluate(TBODY_TEXT_JS)
+    start = time.perf_counter()
+    await locator.click()
+    try:
+        await page.wait_for_function(TABLE_CHANGED_JS, arg=before, polling="raf", timeout=timeout)
+        ok = True
+    except AsyncTimeoutError:
+        ok = False
+    return _record(label, start, ok)
+
+
+async def wait_for_enabled_async(page, selector, label=None, timeout=10000):
+    start = time.perf_counter()
+    try:
+        await page.wait_for_function(ENABLED_JS, arg=selector, polling="raf", timeout=timeout)
+        ok = True
+    except AsyncTimeoutError:
+        ok = False
+    return _record(label or f"{selector} enabled", start, ok)
+
+
+async def wait_for_visible_async(page, selector, label=None, timeout=10000):
+    start = time.perf_counter()
+    try:
+        await page.locator(selector).first.wait_for(state="visible", timeout=timeout)
+        ok = True
+    except AsyncTimeoutError:
+        ok = False
+    return _record(label or f"{selector} visible", start, ok)
@@ -0,0 +1,110 @@
+"""
+Server-clock-synchronised release timer.
+
+estimate_offset() works out what time loisirs.montreal.ca thinks it is from
+repeated HTTP Date headers. A Date header only has one-second resolution, but
+each response pins the server clock to [Date, Date + 1s) at some point during
+the request, so intersecting many samples taken at different sub-second
+phases narrows the offset down to tens of milliseconds.
+
+sleep_until() then wakes at the server's release instant: a coarse sleep
+followed by a short busy-wait on the monotonic clock. server_now() reads the
+server clock with the last estimate, for code that only needs "now".
+"""
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+IC3_URL = "https://loisirs.montreal.ca/IC3/"
+
+SPIN_SECONDS = 0.02  # busy-wait the last 20ms for millisecond wake precision
+
+_last_offset = None  # offset of the last estimate_offset() call, for server_now()
+
+
+def estimate_offset(url=IC3_URL, max_samples=12, target_width=0.05, session=None):
+    """
+    Estimate server_clock - local_clock in seconds.
+
+    Returns (offset, uncertainty) where uncertainty is the half-width of the
+    interval the offset is known to lie in, or (0.0, None) if the server
+    could not be reached.
+    """
+    global _last_offset
+    session = session or requests.Session()
+    low, high = float("-inf"), float("inf")
+    midpoints = []
+
+    for i in range(max_samples):
+        t0 = time.time()
+        try:
+            response = session.head(url, timeout=5, allow_redirects=False)
+        except requests.RequestException as e:
+            print(f"⚠️ [CLOCK] Date sample failed: {e}")
+            continue
+        t1 = time.time()
+
+        date_header = response.headers.get("Date")
+        if not date_header:
+            continue
+        server_second = parsedate_to_datetime(date_header).timestamp()
+
+        # Server time was in [D, D+1) at some local instant in [t0, t1]
+        low = max(low, server_second - t1)
+        high = min(high, server_second + 1 - t0)
+        midpoints.append(server_second + 0.5 - (t0 + t1) / 2)
+
+        if high - low <= target_width:
+            break
+        # Step to a different sub-second phase for the next sample
+        time.sleep(0.1 + 0.37 * ((i * 0.618) % 1))
+
+    if not midpoints:
+        print("⚠️ [CLOCK] No Date headers received, trusting the local clock")
+        _last_offset = 0.0
+        return 0.0, None
+
+    if low <= high:
+        offset, uncertainty = (low + high) / 2, (high - low) / 2
+    else:
+        # Inconsistent samples (local clock stepped mid-run): fall back to the median
+        midpoints.sort()
+        offset, uncertainty = midpoints[len(midpoints) // 2], 0.5
+
+    print(f"[CLOCK] Server offset {offset * 1000:+.0f}ms (±{uncertainty * 1000:.0f}ms, {len(midpoints)} samples)")
+    _last_offset = offset
+    return offset, uncertainty
+
+
+def offset_known():
+    return _last_offset is not None
+
+
+def server_now():
+    """Current server time with the last estimated offset (the local clock before any estimate)."""
+    return server_time(_last_offset or 0.0)
+
+
+def server_time(offset):
+    """Current server time as a Unix timestamp."""
+    return time.time() + offset
+
+
+def sleep_until(server_epoch, offset):
+    """
+    Sleep until the server clock reads server_epoch, then log the wake error
+    (positive = woke late). Returns the wake error in milliseconds.
+    """
+    local_target = server_epoch - offset
+    deadline = time.perf_counter() + (local_target - time.time())
+
+    coarse = deadline - SPIN_SECONDS - time.perf_counter()
+    if coarse > 0:
+        time.sleep(coarse)
+    while time.perf_counter() < deadline:
+        pass
+
+    wake_error_ms = (time.time() - local_target) * 1000
+    print(f"[CLOCK] Woke at server release instant ({wake_error_ms:+.1f}ms wake error)")
+    return wake_error_ms
@@ -0,0 +1,136 @@
+"""
+Pre-release row index.
+
+Tomorrow's court/time rows are listed well before the 17:00/19:00 release,
+they just aren't bookable yet. With PRE_INDEX=true (on top of ARMED=true,
+which stages the search page early) the staged search is crawled once before
+the release and every row matching a priority slot is recorded with its
+facility, results page and row position.
+
+At the release instant try_find_slot_indexed goes straight to those rows: it
+pages forward only as far as the indexed rows need, reads just those rows in
+one evaluate and clicks the wanted fa-plus, without scanning anything else.
+If a row no longer says what it said before the release, the index is stale
+and the caller falls back to the normal scan.
+"""
+import os
+
+from claim_ledger import ClaimPicker
+from fast_scan import add_to_cart, extract_rows, match_rows
+from readiness import click_and_wait_for_table
+
+PRE_INDEX = os.getenv("PRE_INDEX", "false").lower() == "true"
+
+READ_ROWS_JS = """
+({quandIndex, indices}) => {
+    const rows = document.querySelectorAll("div#searchResult tbody tr");
+    return indices.map((i) => {
+        const tr = rows[i];
+        if (!tr) {
+            return null;
+        }
+        const cell = tr.querySelector(`td:nth-child(${quandIndex})`);
+        return {
+            quand: cell ? cell.innerText.trim() : "",
+            hasButton: !!tr.querySelector("button i.fa-plus"),
+        };
+    });
+}
+"""
+
+
+class RowIndex:
+    """Priority-slot rows of one search, recorded before they become bookable."""
+
+    def __init__(self, target_date, quand_index):
+        self.target_date = target_date
+        self.quand_index = quand_index
+        self.entries = []  # {"priority", "slot", "page", "index", "quand", "facility"}
+
+    def pages(self):
+        return sorted({entry["page"] for entry in self.entries})
+
+    def on_page(self, page_no):
+        return [entry for entry in self.entries if entry["page"] == page_no]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def _next_page(page):
+    next_li = page.locator("li.pagination-next")
+    click_and_wait_for_table(page, next_li.locator("a.ng-binding", has_text=">"), "next page")
+
+
+def build_row_index(page, priority_slots, target_date):
+    """Crawl every page of the staged search. Returns a RowIndex, or None if nothing matched."""
+    print("[INDEX] Indexing tomorrow's rows ahead of the release...")
+    page.wait_for_selector("div#searchResult")
+    row_index = None
+    page_no = 1
+    while True:
+        result = extract_rows(page)
+        if result is None or result["quandIndex"] is None:
+            print("❌ 'Quand' column not found, nothing indexed.")
+            return None
+        if row_index is None:
+            row_index = RowIndex(target_date, result["quandIndex"])
+        for priority, slot, row in match_rows(result["rows"], priority_slots, target_date):
+            row_index.entries.append({
+                "priority": priority,
+                "slot": slot,
+                "page": page_no,
+                "index": row["index"],
+                "quand": row["quand"],
+                "facility": row.get("facility"),
+            })
+        if not (result["hasPagination"] and result["hasNext"]):
+            break
+        _next_page(page)
+        page_no += 1
+
+    # Same order the table scan visits them in: page, then priority, then row
+    row_index.entries.sort(key=lambda e: (e["page"], e["priority"], e["index"]))
+    for entry in row_index.entries:
+        print(f"[INDEX] P{entry['priority']} '{entry['slot']}' on page {entry['page']}, row {entry['index']+1} ({entry['facility'] or '?'})")
+    if not row_index:
+        print("[INDEX] No priority slot listed yet, the release will scan as usual.")
+        return None
+    return row_index
+
+
+def try_find_slot_indexed(page, row_index, prefer_second=False, ledger=None, account=None):
+    """
+    Book straight from the pre-release index.
+
+    Returns (handled, slot). handled is False when an indexed row has moved
+    and the caller should scan the table instead.
+    """
+    print(f"[SCAN] Checking {len(row_index)} indexed row(s)...")
+    page.wait_for_selector("div#searchResult")
+    picker = ClaimPicker(prefer_second, ledger, account)
+    current = 1
+    for page_no in row_index.pages():
+        while current < page_no:
+            print("➡️ Moving to next page...")
+            _next_page(page)
+            current += 1
+
+        entries = row_index.on_page(page_no)
+        live = page.evaluate(READ_ROWS_JS, {
+            "quandIndex": row_index.quand_index,
+            "indices": [entry["index"] for entry in entries],
+        })
+        for entry, row in zip(entries, live):
+            if row is None or row["quand"] != entry["quand"]:
+                print(f"⚠️ [INDEX] Row {entry['index']+1} on page {page_no} has moved, index is stale.")
+                return False, None
+            if not row["hasButton"]:
+                continue
+            if picker.take(row_index.target_date, entry["slot"], entry["facility"]):
+                print(f"✅ [P{entry['priority']}] Booking indexed row '{entry['slot']}'")
+                add_to_cart(page, entry["index"])
+                return True, entry["slot"]
+
+    print("⛔ No indexed row could be taken.")
+    return True, None
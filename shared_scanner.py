@@ -0,0 +1,249 @@
+"""
+Single-scanner / many-booker pipeline for multi_booking.py.
+
+Without it every account runs its own run_search/try_find_slot loop, so
+search traffic grows with the number of accounts and each one sees a new row
+at a slightly different moment. With SHARED_SCANNER=true a single scanner
+page runs the search loop for the date and borough, and after every scan
+publishes every bookable row that no booker is holding to every booker's
+asyncio.Queue. Rows a booker skipped or gave back are therefore offered again
+for as long as the table lists them.
+
+Bookers (one per account context) never poll. Each one stages the result
+page once, matches the latest published rows against its own priority slots,
+claims one through the ledger and holds it in the feed, then brings that row
+up on its own page (one in-place search and a jump straight to the row's
+results page) and clicks fa-plus. If the row is gone by then the claim and
+the hold are released and the booker waits for the next batch.
+"""
+import asyncio
+import os
+import re
+import time
+
+from armed import KEEPALIVE_JS, KEEPALIVE_SECONDS
+from async_booking import (
+    FAST_REFRESH,
+    RETRIES,
+    add_to_cart,
+    checkout,
+    keep_warm_until,
+    log,
+    refresh_search,
+    run_search,
+)
+from claim_ledger import ClaimPicker
+from fast_scan import EXTRACT_ROWS_JS, match_rows, page_quand_index, remember_quand_index
+from poll_schedule import make_schedule
+from readiness import click_and_wait_for_table_async
+
+SHARED_SCANNER = os.getenv("SHARED_SCANNER", "false").lower() == "true"
+
+
+_results_page = {}  # booker page -> results page it shows
+
+
+async def next_page(page):
+    next_li = page.locator("li.pagination-next")
+    await click_and_wait_for_table_async(page, next_li.locator("a.ng-binding", has_text=">"), "next page")
+
+
+async def show_results_page(page, page_no):
+    """Jump to a results page through its numbered link, or page forward if there is none."""
+    current = _results_page.get(page, 1)
+    if page_no != current:
+        link = page.locator("ul.pagination li a", has_text=re.compile(rf"^\s*{page_no}\s*$"))
+        if await link.count():
+            await click_and_wait_for_table_async(page, link.first, f"results page {page_no}")
+        else:
+            for _ in range(page_no - current):
+                await next_page(page)
+    _results_page[page] = page_no
+
+
+async def extract_page(page):
+    await page.wait_for_selector("div#searchResult")
+    result = await page.evaluate(EXTRACT_ROWS_JS, page_quand_index(page))
+    if result is None or result["quandIndex"] is None:
+        log("❌ 'Quand' column not found.")
+        return None
+    remember_quand_index(page, result)
+    return result
+
+
+async def scan_all_pages(page):
+    """
+    Every bookable row of the current search, across all result pages.
+    Rows get a global "index", plus the "page" and in-page "row" to find them again.
+    """
+    rows = []
+    page_no = 1
+    while True:
+        result = await extract_page(page)
+        if result is None:
+            return rows
+        for row in result["rows"]:
+            if row["hasButton"]:
+                rows.append(dict(row, index=len(rows), page=page_no, row=row["index"]))
+        if not (result["hasPagination"] and result["hasNext"]):
+            return rows
+        await next_page(page)
+        page_no += 1
+
+
+class RowFeed:
+    """Fans the scanner's bookable rows out to one queue per booker."""
+
+    def __init__(self):
+        self.queues = []
+        self._seen = set()
+        self._held = set()  # rows a booker is adding to its cart or checking out
+
+    @staticmethod
+    def row_key(row):
+        return row["quand"], row.get("facility") or "", row["occurrence"]
+
+    def subscribe(self):
+        queue = asyncio.Queue()
+        self.queues.append(queue)
+        return queue
+
+    def hold(self, row):
+        self._held.add(self.row_key(row))
+
+    def release(self, row):
+        self._held.discard(self.row_key(row))
+
+    def publish(self, rows):
+        """Push every row no booker holds. Returns the rows missing from the previous scan."""
+        counts = {}
+        current = set()
+        fresh = []
+        offered = []
+        for row in rows:
+            # Identical rows (same time, same facility) are told apart by occurrence
+            base = (row["quand"], row.get("facility") or "")
+            counts[base] = counts.get(base, 0) + 1
+            row["occurrence"] = counts[base]
+            key = self.row_key(row)
+            current.add(key)
+            if key not in self._seen:
+                fresh.append(row)
+            if key not in self._held:
+                offered.append(row)
+        self._seen = current
+        if offered:
+            for queue in self.queues:
+                queue.put_nowait(offered)
+        return fresh
+
+    def close(self):
+        for queue in self.queues:
+            queue.put_nowait(None)
+
+
+async def run_scanner(page, date_str, release_epoch, feed, done, released=None):
+    """Search on the polling schedule and publish new rows until done is set or the window ends."""
+    try:
+        if released is not None:
+            log("[ARMED] Staging scanner page ahead of the release...")
+            await run_search(page, date_str)
+            await keep_warm_until(page, released)
+
+        schedule = make_schedule(release_epoch, retries=RETRIES)
+        attempt = 0
+        while not done.is_set():
+            log(f"[{schedule.describe()}] Scanning {date_str} for every booker...")
+            started = time.perf_counter()
+            if not ((attempt > 0 or released is not None) and FAST_REFRESH and await refresh_search(page, date_str)):
+                await run_search(page, date_str)
+            fresh = feed.publish(await scan_all_pages(page))
+            if fresh:
+                log(f"📣 [SCANNER] Published {len(fresh)} new row(s)")
+
+            schedule.observe(time.perf_counter() - started)
+            delay = schedule.next_delay()
+            if delay is None:
+                log("❌ [SCANNER] Retry window over.")
+                return
+            try:
+                await asyncio.wait_for(done.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            attempt += 1
+    finally:
+        feed.close()
+
+
+async def find_row(page, row):
+    """The bookable row on the current table matching a published row, or None."""
+    result = await extract_page(page)
+    if result is None:
+        return None
+    same = [
+        r for r in result["rows"]
+        if r["hasButton"] and r["quand"] == row["quand"] and r.get("facility") == row.get("facility")
+    ]
+    # Prefer the exact position, else the first identical row
+    return next((r for r in same if r["index"] == row["row"]), same[0] if same else None)
+
+
+async def open_row(page, row, date_str):
+    """Bring a published row up on this booker's page and click its fa-plus. False if it's gone."""
+    # Already on the row's results page after an earlier refresh: no search needed
+    target = await find_row(page, row) if _results_page.get(page) == row["page"] else None
+    if target is None:
+        if not await refresh_search(page, date_str):
+            await run_search(page, date_str)
+        _results_page[page] = 1
+        await show_results_page(page, row["page"])
+        target = await find_row(page, row)
+    if target is None:
+        log(f"⚠️ [BOOKER] '{row['quand']}' is no longer on page {row['page']}.")
+        return False
+    await add_to_cart(page, target["index"])
+    return True
+
+
+async def next_batch(page, queue):
+    """Wait for the scanner's latest batch, keeping the staged page warm meanwhile."""
+    while True:
+        try:
+            rows = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            await page.evaluate(KEEPALIVE_JS)
+            continue
+        # Every batch offers the whole table, so only the latest one matters
+        while rows is not None and not queue.empty():
+            rows = queue.get_nowait()
+        return rows
+
+
+async def run_booker(page, feed, queue, account_name, priority_slots, date_str, ledger, prefer_second=False):
+    """Book from the scanner's published rows. Returns the booked slot or None."""
+    log("[BOOKER] Staging result page...")
+    await run_search(page, date_str)
+    _results_page[page] = 1
+
+    while True:
+        rows = await next_batch(page, queue)
+        if rows is None:
+            log("❌ Scanner stopped without a slot for this account.")
+            return None
+
+        picker = ClaimPicker(prefer_second, ledger, account_name)
+        for priority, slot, row in match_rows(rows, priority_slots, date_str):
+            if not picker.take(date_str, slot, row.get("facility"), row["occurrence"]):
+                continue
+            feed.hold(row)
+            if await open_row(page, row, date_str):
+                log(f"✅ [P{priority}] Booking '{slot}'")
+                try:
+                    await checkout(page)
+                except Exception:
+                    picker.release()
+                    feed.release(row)
+                    raise
+                return slot
+            picker.release()
+            feed.release(row)
@@ -0,0 +1,96 @@
+"""
+Structured slot model and indexed matcher.
+
+Every result row is parsed once into a compact SlotRow (date, start and end
+minute, facility, row index) and put into a SlotIndex keyed by
+(date, start minute). Each priority slot is then resolved with one dict
+lookup instead of a substring test against every row.
+
+Time labels are normalised, so the project's odd labels line up with what
+the site renders:
+    "24:00 - 25:00" on 2025-07-24  ->  2025-07-25 00:00-01:00
+    "23:00 - 24:00"  ==  "23:00 - 00:00"
+    "19h00 à 20h00"  ==  "19:00 - 20:00"
+"""
+import re
+from datetime import date as Date, timedelta
+
+_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_RANGE = re.compile(r"(\d{1,2})\s*[:h]\s*(\d{2})\s*(?:-|–|à)\s*(\d{1,2})\s*[:h]\s*(\d{2})", re.IGNORECASE)
+
+DAY = 24 * 60
+
+
+def parse_range(text):
+    """'19:00 - 20:00' -> (1140, 1200), or None. End is always after start."""
+    m = _RANGE.search(text)
+    if not m:
+        return None
+    start = int(m.group(1)) * 60 + int(m.group(2))
+    end = int(m.group(3)) * 60 + int(m.group(4))
+    if end <= start:
+        end += DAY
+    return start, end
+
+
+def normalise(date_str, start, end):
+    """Roll start minutes past midnight ("24:00") over onto the next day."""
+    days, start = divmod(start, DAY)
+    if days:
+        date_str = (Date.fromisoformat(date_str) + timedelta(days=days)).isoformat()
+        end -= days * DAY
+    return date_str, start, end
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class SlotRow:
+    __slots__ = ("date", "start", "end", "facility", "index")
+
+    def __init__(self, date, start, end, facility=None, index=None):
+        self.date, self.start, self.end = normalise(date, start, end)
+        self.facility = facility
+        self.index = index
+
+    @classmethod
+    def parse(cls, text, index=None, facility=None):
+        """Parse a rendered 'Quand' cell. Returns None if it has no date and time range."""
+        date_match = _DATE.search(text)
+        times = parse_range(text)
+        if not date_match or not times:
+            return None
+        return cls(date_match.group(0), times[0], times[1], facility, index)
+
+    def key(self):
+        return self.date, self.start
+
+    def label(self):
+        return f"{self.date} {format_minutes(self.start)} - {format_minutes(self.end % DAY)}"
+
+    def __repr__(self):
+        return f"SlotRow({self.label()!r}, facility={self.facility!r}, index={self.index})"
+
+
+class SlotIndex:
+    """SlotRows grouped by (date, start minute), each bucket in row order."""
+
+    def __init__(self, rows=()):
+        self._by_key = {}
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        self._by_key.setdefault(row.key(), []).append(row)
+
+    def lookup(self, slot, target_date):
+        """Rows matching a priority slot label on target_date."""
+        times = parse_range(slot)
+        if times is None:
+            return []
+        date_str, start, end = normalise(target_date, *times)
+        return [row for row in self._by_key.get((date_str, start), ()) if row.end == end]
+
+    def __len__(self):
+        return sum(len(rows) for rows in self._by_key.values())
@@ -0,0 +1,239 @@
+"""
+Local mock of the IC3 search and cart pages.
+
+MockSite answers every https://loisirs.montreal.ca request of a Playwright
+context (context.route), so the real booking code runs unchanged against it:
+the U6510 search page with its borough tree, a search XHR with pagination,
+fa-plus rows, and the U3600 cart with the select / checkout / payment steps.
+Rows listed in steal are taken by "someone else" as soon as we add them, so
+their cart line shows a "no longer available" error. With cart_limit, adding
+past that many cart lines is refused with an alert on the results page.
+"""
+import json
+import math
+import os
+import sys
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SITE = "https://loisirs.montreal.ca/**"
+
+MOCK_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"></head>
+<body><div id="app"></div>
+<script>
+const app = document.getElementById("app");
+const state = { keyword: "", date: "", page: 1, boroughs: new Set(), results: null };
+let cart = [], selected = {}, confirmed = {}, step = "cart";
+
+const post = (path, body) => fetch(path, { method: "POST", body: JSON.stringify(body || {}) });
+
+function route() {
+    if (location.hash.startsWith("#/U3600")) {
+        loadCart();
+    } else {
+        renderSearch();
+    }
+}
+
+function renderSearch() {
+    app.innerHTML = `
+        <input id="u6510_edSearch">
+        <button id="u6510_btnTreeBorough">Arrondissements</button>
+        <div id="tree" style="display: none">
+            <label for="u2000_chkValue3">Anjou</label><input type="checkbox" id="u2000_chkValue3">
+            <label for="u2000_chkValue11">Saint-Léonard</label><input type="checkbox" id="u2000_chkValue11">
+            <button id="u2000_btnTreeSelectConfirm">OK</button>
+        </div>
+        <input name="reserveDate">
+        <div id="results"></div>`;
+    const keyword = document.getElementById("u6510_edSearch");
+    keyword.value = state.keyword;
+    keyword.addEventListener("input", () => { state.keyword = keyword.value; });
+    const tree = document.getElementById("tree");
+    document.getElementById("u6510_btnTreeBorough").onclick = () => { tree.style.display = "block"; };
+    document.getElementById("u2000_btnTreeSelectConfirm").onclick = () => { tree.style.display = "none"; };
+    tree.querySelectorAll("input").forEach((box) => {
+        box.checked = state.boroughs.has(box.id);
+        box.addEventListener("change", () => {
+            box.checked ? state.boroughs.add(box.id) : state.boroughs.delete(box.id);
+        });
+    });
+    const date = document.querySelector("input[name='reserveDate']");
+    date.value = state.date;
+    date.addEventListener("input", () => {
+        state.date = date.value;
+        if (date.value) {
+            state.page = 1;
+            search();
+        }
+    });
+    document.getElementById("results").addEventListener("click", (event) => {
+        const add = event.target.closest("button.add");
+        const link = event.target.closest("a");
+        if (add) {
+            post("/IC3/api/cart/add", { id: Number(add.dataset.id) }).then((r) => r.ok
+                ? (location.hash = "#/U3600/cart")
+                : r.json().then((data) => {
+                    document.getElementById("results").insertAdjacentHTML(
+                        "afterbegin", `<div class="alert-danger" role="alert">${data.error}</div>`);
+                }));
+        } else if (link && link.dataset.page) {
+            state.page = Number(link.dataset.page);
+            search();
+        } else if (link && !link.closest("li").classList.contains("disabled")) {
+            state.page += 1;
+            search();
+        }
+    });
+    if (state.results) {
+        renderResults();
+    }
+}
+
+function search() {
+    const boroughs = Array.from(state.boroughs).join(",");
+    fetch(`/IC3/api/search?date=${state.date}&page=${state.page}&boroughs=${boroughs}`)
+        .then((r) => r.json())
+        .then((data) => { state.results = data; renderResults(); });
+}
+
+function renderResults() {
+    const data = state.results;
+    const rows = data.items.map((item) => `
+        <tr><td>Pickleball</td><td>${item.facility}</td><td>${item.quand}</td>
+        <td>${item.bookable ? `<button class="add" data-id="${item.id}"><i class="fa fa-plus"></i></button>` : ""}</td></tr>`);
+    const pages = Array.from({ length: data.pages }, (_, i) => `<li><a class="ng-binding" data-page="${i + 1}">${i + 1}</a></li>`);
+    const last = data.page >= data.pages ? "disabled" : "";
+    document.getElementById("results").innerHTML = `
+        <div id="searchResult"><table>
+            <thead><tr><th>Activité</th><th>Lieu</th><th>Quand</th><th></th></tr></thead>
+            <tbody>${rows.join("")}</tbody>
+        </table>
+        <ul class="pagination">${pages.join("")}<li class="pagination-next ${last}"><a class="ng-binding">&gt;</a></li></ul>
+        </div>`;
+}
+
+function loadCart() {
+    fetch("/IC3/api/cart").then((r) => r.json()).then((data) => {
+        cart = data.items;
+        selected = {};
+        confirmed = {};
+        step = "cart";
+        renderCart();
+    });
+}
+
+function renderCart() {
+    const lines = cart.map((item, n) => `
+        <tr><td>${item.quand} ${item.facility}</td>
+        <td>${item.lost ? `<span class="alert-danger" role="alert">Cette plage n'est plus disponible</span>` : ""}</td>
+        <td>${!item.lost && !selected[n] ? `<button id="u3600_btnSelect${n}" data-n="${n}">Choisir</button>` : ""}
+            ${!item.lost && selected[n] && !confirmed[n] ? `<button id="u3600_btnCheckout${n}" data-n="${n}">Confirmer</button>` : ""}</td>
+        <td><button id="u3600_btnRemove${n}" data-n="${n}"><i class="fa fa-trash"></i></button></td></tr>`);
+    let tail = "";
+    if (step === "cart" && cart.length && cart.every((item, n) => !item.lost && confirmed[n])) {
+        tail = `<button id="u3600_btnCartShoppingCompleteStep">Continuer</button>`;
+    } else if (step === "payment") {
+        tail = `<input type="checkbox" id="u3600_chkElectronicPaymentCondition">
+                <input type="checkbox" id="u3600_chkLocationCondition">
+                <button id="u3600_btnCartPaymentCompleteStep">Payer</button>`;
+    } else if (step === "done") {
+        tail = `<div id="confirmation">Réservation confirmée</div>`;
+    }
+    app.innerHTML = `<table id="cart"><tbody>${lines.join("")}</tbody></table>${tail}`;
+}
+
+app.addEventListener("click", (event) => {
+    const button = event.target.closest("button");
+    if (!button || !location.hash.startsWith("#/U3600")) {
+        return;
+    }
+    const n = Number(button.dataset.n);
+    if (button.id.startsWith("u3600_btnSelect")) {
+        selected[n] = true;
+        renderCart();
+    } else if (button.id.startsWith("u3600_btnCheckout")) {
+        confirmed[n] = true;
+        renderCart();
+    } else if (button.id.startsWith("u3600_btnRemove")) {
+        post("/IC3/api/cart/remove", { line: n }).then(loadCart);
+    } else if (button.id === "u3600_btnCartShoppingCompleteStep") {
+        step = "payment";
+        renderCart();
+    } else if (button.id === "u3600_btnCartPaymentCompleteStep") {
+        const boxes = ["u3600_chkElectronicPaymentCondition", "u3600_chkLocationCondition"];
+        if (boxes.every((id) => document.getElementById(id).checked)) {
+            post("/IC3/api/cart/pay").then(() => { step = "done"; renderCart(); });
+        }
+    }
+});
+
+window.addEventListener("hashchange", route);
+route();
+</script>
+</body></html>
+"""
+
+
+class MockSite:
+    """Server side of the mock: result rows, the cart and what got paid for."""
+
+    def __init__(self, rows, page_size=3, steal=(), cart_limit=None):
+        self.rows = [
+            {"id": i, "quand": quand, "facility": facility, "bookable": bookable}
+            for i, (quand, facility, bookable) in enumerate(rows)
+        ]
+        self.page_size = page_size
+        self.steal = set(steal)
+        self.cart_limit = cart_limit
+        self.lost = set()
+        self.cart = []  # row ids, in cart line order
+        self.booked = []  # row ids, in payment order
+        self.searches = []  # query dict of every search XHR
+
+    def _json(self, payload, status=200):
+        return {"status": status, "content_type": "application/json", "body": json.dumps(payload)}
+
+    def respond(self, request):
+        """Keyword arguments for route.fulfill() answering request."""
+        parts = urlsplit(request.url)
+        body = json.loads(request.post_data or "{}") if request.method == "POST" else {}
+        if parts.path == "/IC3/api/search":
+            query = dict(parse_qsl(parts.query))
+            self.searches.append(query)
+            page = int(query.get("page", 1))
+            items = [row for row in self.rows if row["quand"].startswith(query.get("date", ""))]
+            pages = max(1, math.ceil(len(items) / self.page_size))
+            chunk = items[(page - 1) * self.page_size:page * self.page_size]
+            return self._json({"items": chunk, "page": page, "pages": pages})
+        if parts.path == "/IC3/api/cart":
+            items = [dict(self.rows[row_id], lost=row_id in self.lost) for row_id in self.cart]
+            return self._json({"items": items})
+        if parts.path == "/IC3/api/cart/add":
+            row_id = body["id"]
+            if self.cart_limit is not None and len(self.cart) >= self.cart_limit:
+                return self._json({"error": "Vous avez atteint la limite de réservations"}, status=409)
+            self.cart.append(row_id)
+            if row_id in self.steal:
+                self.lost.add(row_id)
+                self.rows[row_id]["bookable"] = False
+            return self._json({"ok": True})
+        if parts.path == "/IC3/api/cart/remove":
+            self.cart.pop(body["line"])
+            return self._json({"ok": True})
+        if parts.path == "/IC3/api/cart/pay":
+            self.booked.extend(row_id for row_id in self.cart if row_id not in self.lost)
+            self.cart = []
+            return self._json({"ok": True})
+        return {"status": 200, "content_type": "text/html; charset=utf-8", "body": MOCK_HTML}
+
+    def install(self, context):
+        context.route(SITE, lambda route: route.fulfill(**self.respond(route.request)))
+
+    async def install_async(self, context):
+        async def handle(route):
+            await route.fulfill(**self.respond(route.request))
+
+        await context.route(SITE, handle)
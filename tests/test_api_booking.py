@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("playwright")
+
+from api_booking import response_problem  # noqa: E402
+
+
+def test_a_200_with_an_error_body_is_a_failure():
+    recorded = {"success": True, "cartId": 41}
+    assert response_problem(recorded, {"success": True, "cartId": 42}) is None
+    assert response_problem(recorded, {"success": False, "cartId": 42}) == "success is false"
+    assert response_problem(recorded, {"success": True, "cartId": 42, "error": "Session expirée"})
+    assert response_problem(recorded, {"success": True}) == "missing cartId"
+    assert response_problem(recorded, None) == "no JSON body"
+
+
+def test_status_text_is_compared_with_the_recording():
+    recorded = {"status": "CONFIRMED"}
+    assert response_problem(recorded, {"status": "CONFIRMED"}) is None
+    assert response_problem(recorded, {"status": "PAYMENT_FAILED"}) == "status: PAYMENT_FAILED"
+    # Nothing recorded to compare with: only the HTTP status counts
+    assert response_problem(None, {"anything": 1}) is None
@@ -0,0 +1,101 @@
+"""
+The async pipeline (async_booking.py) must book exactly what the sync
+final_booking flow books. Both run against the same local mock site.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from playwright.async_api import async_playwright  # noqa: E402
+from playwright.sync_api import sync_playwright  # noqa: E402
+
+import async_booking  # noqa: E402
+import final_booking_calvin as sync_booking  # noqa: E402
+from conftest import MockSite  # noqa: E402
+from fast_scan import try_find_slot_inpage  # noqa: E402
+from lean_profile import context_options, launch_browser  # noqa: E402
+
+DATE = "2030-01-02"
+SLOTS = ["19:00 - 20:00"]
+ROWS = [
+    (f"{DATE} 18:00 - 19:00", "Aréna A", True),
+    (f"{DATE} 19:00 - 20:00", "Aréna A", False),  # listed, not bookable
+    (f"{DATE} 19:00 - 20:00", "Parc B", True),
+    (f"{DATE} 20:00 - 21:00", "Parc B", True),
+    (f"{DATE} 19:00 - 20:00", "Parc C", True),  # on results page 2
+    ("2030-01-03 19:00 - 20:00", "Parc C", True),
+]
+
+
+def book_sync(site, prefer_second):
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        context = browser.new_context(**context_options())
+        site.install(context)
+        page = context.new_page()
+        sync_booking.run_search(page, DATE)
+        slot = sync_booking.try_find_slot(page, SLOTS, DATE, prefer_second=prefer_second)
+        if slot:
+            sync_booking.checkout(page, lambda step: None)
+            page.wait_for_selector("#confirmation")
+        browser.close()
+    return slot
+
+
+async def book_async(site, prefer_second):
+    async with async_playwright() as p:
+        browser = await launch_browser(p)
+        context = await browser.new_context(**context_options())
+        await site.install_async(context)
+        page = await context.new_page()
+        await async_booking.run_search(page, DATE)
+        slot = await async_booking.try_find_slot(page, SLOTS, DATE, prefer_second=prefer_second)
+        if slot:
+            await async_booking.checkout(page)
+            await page.wait_for_selector("#confirmation")
+        await browser.close()
+    return slot
+
+
+@pytest.mark.parametrize("prefer_second, booked_row", [(False, 2), (True, 4)])
+def test_async_flow_books_the_same_row_as_sync(prefer_second, booked_row):
+    sync_site = MockSite(ROWS)
+    async_site = MockSite(ROWS)
+
+    sync_slot = book_sync(sync_site, prefer_second)
+    async_slot = asyncio.run(book_async(async_site, prefer_second))
+
+    assert sync_slot == async_slot == "19:00 - 20:00"
+    assert sync_site.booked == async_site.booked == [booked_row]
+    # Same searches too: the borough filter, the date and every results page visited
+    assert sync_site.searches == async_site.searches
+    assert all(search["boroughs"] == "u2000_chkValue11" for search in sync_site.searches)
+
+
+def test_nothing_booked_when_no_row_matches():
+    rows = [(f"{DATE} 19:00 - 20:00", "Aréna A", False)]
+    sync_site = MockSite(rows)
+    async_site = MockSite(rows)
+
+    assert book_sync(sync_site, False) is None
+    assert asyncio.run(book_async(async_site, False)) is None
+    assert sync_site.booked == async_site.booked == []
+
+
+@pytest.mark.parametrize("prefer_second, booked_row", [(False, 2), (True, 4)])
+def test_inpage_scan_skips_rows_without_fa_plus(prefer_second, booked_row):
+    site = MockSite(ROWS)
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        context = browser.new_context(**context_options())
+        site.install(context)
+        page = context.new_page()
+        sync_booking.run_search(page, DATE)
+        slot = try_find_slot_inpage(page, SLOTS, DATE, prefer_second=prefer_second)
+        page.wait_for_selector("button#u3600_btnSelect0")
+        browser.close()
+
+    assert slot == "19:00 - 20:00"
+    assert site.cart == [booked_row]
@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("playwright")
+
+from playwright.sync_api import sync_playwright  # noqa: E402
+
+import final_booking_calvin as booking  # noqa: E402
+from boroughs import BoroughNotFound, select_borough  # noqa: E402
+from conftest import MockSite  # noqa: E402
+from lean_profile import context_options, launch_browser  # noqa: E402
+
+DATE = "2030-01-02"
+
+
+@pytest.fixture
+def site_page():
+    site = MockSite([(f"{DATE} 19:00 - 20:00", "Parc B", True)])
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        context = browser.new_context(**context_options())
+        site.install(context)
+        yield site, context.new_page()
+        browser.close()
+
+
+def test_borough_is_resolved_by_name(site_page):
+    site, page = site_page
+    booking.run_search(page, DATE, borough="saint leonard")
+    assert [search["boroughs"] for search in site.searches] == ["u2000_chkValue11"]
+
+
+def test_unknown_borough_aborts_the_search(site_page):
+    site, page = site_page
+    page.goto("https://loisirs.montreal.ca/IC3/#/U6510/search")
+    with pytest.raises(BoroughNotFound):
+        select_borough(page, "Saint-Leonrad")
+    with pytest.raises(BoroughNotFound):
+        booking.run_search(page, DATE, borough="Saint-Leonrad")
+    assert site.searches == []
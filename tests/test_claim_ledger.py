@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from claim_ledger import ClaimPicker, SqliteLedger  # noqa: E402
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return SqliteLedger(str(tmp_path / "claims.db"), ttl=60)
+
+
+def test_stale_claims_can_be_taken_over(ledger, monkeypatch):
+    assert ledger.claim("row", "calvin")
+    assert not ledger.claim("row", "ricky")
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert ledger.claim("row", "ricky")
+    assert not ledger.claim("row", "calvin")
+
+
+def test_reclaiming_refreshes_the_claim(ledger, monkeypatch):
+    start = time.time()
+    assert ledger.claim("row", "calvin")
+    monkeypatch.setattr(time, "time", lambda: start + 50)
+    assert ledger.claim("row", "calvin")
+    monkeypatch.setattr(time, "time", lambda: start + 100)
+    assert not ledger.claim("row", "ricky")
+
+
+def test_picker_gives_up_its_previous_row(ledger):
+    picker = ClaimPicker(ledger=ledger, account="calvin")
+    assert picker.take("2030-01-02", "19:00 - 20:00", "Parc B")
+    assert picker.take("2030-01-02", "20:00 - 21:00", "Parc B")
+
+    other = ClaimPicker(ledger=ledger, account="ricky")
+    assert other.take("2030-01-02", "19:00 - 20:00", "Parc B")
+    assert not other.take("2030-01-02", "20:00 - 21:00", "Parc B")
+
+
+def test_release_all(ledger):
+    assert ledger.claim("a", "calvin")
+    assert ledger.claim("b", "calvin")
+    ledger.release_all("calvin")
+    assert ledger.claim("a", "ricky")
+    assert ledger.claim("b", "ricky")
+
+
+def test_rearmed_picker_takes_the_next_match_without_a_ledger():
+    picker = ClaimPicker(prefer_second=True)
+    assert not picker.take("2030-01-02", "19:00 - 20:00", "Parc A")
+    assert picker.take("2030-01-02", "19:00 - 20:00", "Parc B")
+    picker.rearm()
+    assert picker.take("2030-01-02", "19:00 - 20:00", "Parc C")
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from playwright.sync_api import sync_playwright  # noqa: E402
+
+import final_booking_calvin as booking  # noqa: E402
+import multi_cart  # noqa: E402
+from conflict import checkout_with_recovery  # noqa: E402
+from conftest import MockSite  # noqa: E402
+from lean_profile import context_options, launch_browser  # noqa: E402
+
+DATE = "2030-01-02"
+ROWS = [
+    (f"{DATE} 19:00 - 20:00", "Parc B", True),
+    (f"{DATE} 19:00 - 20:00", "Parc C", True),
+]
+
+
+def book(site, slots, extra_slots=()):
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        context = browser.new_context(**context_options())
+        site.install(context)
+        page = context.new_page()
+        booking.run_search(page, DATE)
+        slot = booking.try_find_slot(page, slots, DATE)
+        extras = multi_cart.fill_cart(page, slot, list(slots) + list(extra_slots), DATE) if extra_slots else []
+        booked = checkout_with_recovery(
+            page, slot, lambda target, cart_size: booking.checkout(target, lambda step: None, cart_size), extras
+        )
+        page.wait_for_selector("#confirmation")
+        browser.close()
+    return booked
+
+
+def test_lost_row_falls_back_to_the_next_match_without_a_ledger(monkeypatch):
+    monkeypatch.setattr(booking, "LEDGER", None)
+    site = MockSite(ROWS, steal=[0])
+    booked = book(site, ["19:00 - 20:00"])
+
+    assert booked == ["19:00 - 20:00"]
+    assert site.booked == [1]
+    assert site.lost == {0}
+
+
+def test_a_lost_extra_line_leaves_the_rest_of_the_cart(monkeypatch):
+    monkeypatch.setattr(booking, "LEDGER", None)
+    monkeypatch.setattr(multi_cart, "MAX_CART_ROWS", 2)
+    site = MockSite(ROWS + [(f"{DATE} 20:00 - 21:00", "Parc B", True)], steal=[2])
+    booked = book(site, ["19:00 - 20:00"], ["20:00 - 21:00"])
+
+    assert booked == ["19:00 - 20:00"]
+    assert site.booked == [0]
+
+
+def test_the_cart_limit_stops_filling_without_waiting_out_the_timeout(monkeypatch):
+    monkeypatch.setattr(booking, "LEDGER", None)
+    monkeypatch.setattr(multi_cart, "MAX_CART_ROWS", 3)
+    rows = [(f"{DATE} {hour}:00 - {hour + 1}:00", "Parc B", True) for hour in (19, 20, 21)]
+    site = MockSite(rows, cart_limit=1)
+    with sync_playwright() as p:
+        browser = launch_browser(p)
+        context = browser.new_context(**context_options())
+        site.install(context)
+        page = context.new_page()
+        booking.run_search(page, DATE)
+        slot = booking.try_find_slot(page, ["19:00 - 20:00"], DATE)
+        start = time.perf_counter()
+        extras = multi_cart.fill_cart(page, slot, ["19:00 - 20:00", "20:00 - 21:00", "21:00 - 22:00"], DATE)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        browser.close()
+
+    assert extras == []
+    assert elapsed_ms < multi_cart.EXTRA_LINE_TIMEOUT_MS
+    assert site.cart == [0]
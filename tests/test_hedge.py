@@ -0,0 +1,145 @@
+"""
+The hedge gate lets one racer of an account into the cart. Losers must give
+up their ledger claims, and a slow cart is checked before the gate is
+handed to the next racer.
+"""
+import asyncio
+
+import pytest
+
+from hedge import HedgeGate, hedged
+
+DATE = "2030-01-02"
+SLOTS = ["19:00 - 20:00"]
+ROWS = [
+    (f"{DATE} 18:00 - 19:00", "Aréna A", True),
+    (f"{DATE} 19:00 - 20:00", "Parc B", True),
+]
+
+
+def test_the_first_racer_into_the_cart_wins_and_the_others_are_cancelled():
+    added = []
+
+    async def run(ticket, n):
+        await asyncio.sleep(ticket.stagger)
+        if not await ticket.acquire():
+            return None
+        added.append(n)
+        await asyncio.sleep(0.05)  # the cart opening
+        ticket.confirm()
+        await asyncio.sleep(0.05)  # the checkout
+        return f"racer {n}"
+
+    assert asyncio.run(hedged(run, log=lambda message: None, racers=3, stagger_ms=10)) == "racer 0"
+    assert added == [0]
+
+
+def test_a_failed_add_hands_the_gate_to_the_next_racer():
+    added = []
+
+    async def run(ticket, n):
+        await asyncio.sleep(ticket.stagger)
+        if not await ticket.acquire():
+            return None
+        added.append(n)
+        await asyncio.sleep(0.05)
+        if n == 0:
+            ticket.release()  # the row wasn't in the cart
+            return None
+        ticket.confirm()
+        return f"racer {n}"
+
+    assert asyncio.run(hedged(run, log=lambda message: None, racers=2, stagger_ms=10)) == "racer 1"
+    assert added == [0, 1]
+
+
+def _browser_test():
+    pytest.importorskip("playwright")
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    pytest.importorskip("requests")
+    from claim_ledger import SqliteLedger
+
+    return SqliteLedger(str(tmp_path / "claims.db"), ttl=60)
+
+
+async def _search_page(p, site):
+    import async_booking
+    from lean_profile import context_options, launch_browser
+
+    browser = await launch_browser(p)
+    context = await browser.new_context(**context_options())
+    await site.install_async(context)
+    page = await context.new_page()
+    await async_booking.run_search(page, DATE)
+    return browser, page
+
+
+def test_a_racer_cancelled_at_the_gate_gives_up_its_claim(ledger):
+    _browser_test()
+    from playwright.async_api import async_playwright
+
+    import async_booking
+    from claim_ledger import ClaimPicker
+    from conftest import MockSite
+
+    site = MockSite(ROWS)
+
+    async def scenario():
+        async with async_playwright() as p:
+            browser, page = await _search_page(p, site)
+            gate = HedgeGate()
+            holder = gate.ticket(0)
+            assert await holder.acquire()
+
+            async def loser():
+                async_booking.set_account("calvin#2")
+                return await async_booking.try_find_slot(page, SLOTS, DATE, ledger=ledger, ticket=gate.ticket(1))
+
+            task = asyncio.create_task(loser())
+            await asyncio.sleep(1)  # claimed, now waiting for the gate
+            assert not task.done()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            holder.release()
+            await browser.close()
+
+    asyncio.run(scenario())
+    assert site.cart == []
+    assert ClaimPicker(ledger=ledger, account="ricky").take(DATE, SLOTS[0], "Parc B")
+
+
+@pytest.mark.parametrize("cart_limit, in_cart", [(None, True), (0, False)])
+def test_a_slow_cart_is_checked_before_handing_the_gate_back(cart_limit, in_cart, ledger, monkeypatch):
+    _browser_test()
+    from playwright.async_api import async_playwright
+
+    import async_booking
+    from claim_ledger import ClaimPicker
+    from conftest import MockSite
+
+    async def cart_never_opens(page, selector, label=None, timeout=10000):
+        return False
+
+    monkeypatch.setattr(async_booking, "wait_for_enabled_async", cart_never_opens)
+    site = MockSite(ROWS, cart_limit=cart_limit)
+
+    async def scenario():
+        async with async_playwright() as p:
+            browser, page = await _search_page(p, site)
+            gate = HedgeGate()
+            async_booking.set_account("calvin#1")
+            slot = await async_booking.try_find_slot(page, SLOTS, DATE, ledger=ledger, ticket=gate.ticket(0))
+            locked = gate.lock.locked()
+            await browser.close()
+        return slot, gate.winner, locked
+
+    slot, winner, locked = asyncio.run(scenario())
+    if in_cart:
+        assert (slot, winner, site.cart) == (SLOTS[0], 0, [1])
+    else:
+        assert (slot, winner, locked, site.cart) == (None, None, False, [])
+        assert ClaimPicker(ledger=ledger, account="ricky").take(DATE, SLOTS[0], "Parc B")
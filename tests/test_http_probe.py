@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from http_probe import HttpProbe, item_bookable, search_signature  # noqa: E402
+
+
+class FakeRequest:
+    resource_type = "xhr"
+    headers = {}
+
+    def __init__(self, url, post_data=None, method="GET"):
+        self.url = url
+        self.post_data = post_data
+        self.method = method
+
+
+def template(url, body=None):
+    return {"method": "GET", "url": url, "body": body}
+
+
+def test_signature_ignores_the_results_page():
+    first = template("https://x/IC3/api/search?date=2030-01-02&page=1")
+    second = template("https://x/IC3/api/search?page=2&date=2030-01-02")
+    other_day = template("https://x/IC3/api/search?date=2030-01-03&page=1")
+    assert search_signature(first) == search_signature(second)
+    assert search_signature(first) != search_signature(other_day)
+
+    json_first = template("https://x/search", '{"date": "2030-01-02", "pageIndex": 0}')
+    json_next = template("https://x/search", '{"pageIndex": 1, "date": "2030-01-02"}')
+    assert search_signature(json_first) == search_signature(json_next)
+
+
+def test_probe_keeps_the_first_page_until_the_search_changes(tmp_path):
+    state = tmp_path / "state.json"
+    state.write_text('{"cookies": []}')
+    probe = HttpProbe(str(state))
+
+    probe.record(FakeRequest("https://x/IC3/api/search?date=2030-01-02&page=1"))
+    probe.record(FakeRequest("https://x/IC3/api/search?date=2030-01-02&page=2"))
+    assert probe.template["url"].endswith("page=1")
+
+    probe.record(FakeRequest("https://x/IC3/api/search?date=2030-01-03&page=1"))
+    assert "2030-01-03" in probe.template["url"]
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def test_listed_but_unbookable_items_do_not_wake_the_browser(tmp_path):
+    state = tmp_path / "state.json"
+    state.write_text('{"cookies": []}')
+    probe = HttpProbe(str(state))
+    probe.record(FakeRequest("https://x/IC3/api/search?date=2030-01-02&page=1"))
+    items = [
+        {"quand": "2030-01-02 19:00 - 20:00", "facility": "Parc A", "bookable": False},
+        {"quand": "2030-01-02 19:00 - 20:00", "facility": "Parc B", "status": "Réservé"},
+    ]
+    probe.session.request = lambda *args, **kwargs: FakeResponse({"items": items})
+    assert not probe.should_wake_browser(["19:00 - 20:00"], "2030-01-02")
+
+    items.append({"quand": "2030-01-02 19:00 - 20:00", "facility": "Parc C", "bookable": True})
+    assert probe.should_wake_browser(["19:00 - 20:00"], "2030-01-02")
+    assert [item["facility"] for _, item in probe.last_matches] == ["Parc C"]
+
+
+def test_item_bookable_reads_flags_counts_and_status():
+    assert item_bookable({"quand": "2030-01-02 19:00 - 20:00"})
+    assert not item_bookable({"isAvailable": False})
+    assert not item_bookable({"unavailable": True})
+    assert not item_bookable({"availablePlaces": 0})
+    assert item_bookable({"availablePlaces": 2})
+    assert item_bookable({"statut": "Disponible"})
+    assert not item_bookable({"status": "Indisponible"})
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from poll_schedule import BurstSchedule  # noqa: E402
+
+RELEASE = 1_000_000.0
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_stages_follow_the_server_clock():
+    clock = Clock(RELEASE - 6)
+    schedule = BurstSchedule(RELEASE, clock=clock)
+    assert schedule.next_delay() == 3.0
+    clock.now = RELEASE - 4
+    assert schedule.next_delay() == 0.25
+    clock.now = RELEASE + 20
+    assert schedule.next_delay() == 1.0
+    clock.now = RELEASE + 180
+    assert schedule.next_delay() is None
+
+
+def test_search_time_counts_and_slow_searches_stretch_the_interval():
+    clock = Clock(RELEASE + 20)
+    schedule = BurstSchedule(RELEASE, clock=clock)
+    schedule.observe(0.4)
+    assert schedule.next_delay() == pytest.approx(0.6)
+    schedule.observe(2.0)  # average 0.88s, 2.2x the 0.4s baseline: 2.2s interval
+    assert schedule.next_delay() == pytest.approx(0.2)
+    schedule.observe(0.4)  # average 0.736s, back under 2x
+    assert schedule.next_delay() == pytest.approx(0.6)
+
+
+def test_a_run_after_the_window_starts_its_own():
+    clock = Clock(RELEASE + 500)
+    schedule = BurstSchedule(RELEASE, clock=clock)
+    assert schedule.release_epoch == RELEASE + 500
+    assert schedule.next_delay() == 0.25
@@ -0,0 +1,73 @@
+import pytest
+
+from slot_model import SlotIndex, SlotRow, normalise, parse_range
+
+DATE = "2025-07-24"
+
+
+def test_parse_range_accepts_the_site_and_project_labels():
+    assert parse_range("19:00 - 20:00") == (1140, 1200)
+    assert parse_range("19h00 à 20h00") == (1140, 1200)
+    assert parse_range("2025-07-24 9:30 – 10:30") == (570, 630)
+    assert parse_range("pas d'heure") is None
+
+
+def test_a_range_ending_at_midnight_ends_after_it_starts():
+    assert parse_range("23:00 - 24:00") == (1380, 1440)
+    assert parse_range("23:00 - 00:00") == (1380, 1440)
+    assert parse_range("23:30 - 00:30") == (1410, 1470)
+
+
+def test_hours_past_midnight_roll_over_to_the_next_day():
+    assert normalise(DATE, *parse_range("24:00 - 25:00")) == ("2025-07-25", 0, 60)
+    assert normalise("2025-12-31", 1500, 1560) == ("2026-01-01", 60, 120)
+    assert normalise(DATE, 1140, 1200) == (DATE, 1140, 1200)
+
+
+def test_slot_row_parses_a_quand_cell():
+    row = SlotRow.parse(f"{DATE} 19:00 - 20:00", index=3, facility="Parc B")
+    assert row.key() == (DATE, 1140)
+    assert row.label() == f"{DATE} 19:00 - 20:00"
+    assert (row.facility, row.index) == ("Parc B", 3)
+    assert SlotRow.parse("19:00 - 20:00") is None
+    assert SlotRow.parse(DATE) is None
+    assert SlotRow.parse(f"{DATE} 23:00 - 24:00").label() == f"{DATE} 23:00 - 00:00"
+
+
+def test_index_lookup_matches_date_start_and_end():
+    rows = [
+        SlotRow.parse(f"{DATE} 19:00 - 20:00", index=0),
+        SlotRow.parse(f"{DATE} 19:00 - 21:00", index=1),  # same start, longer
+        SlotRow.parse("2025-07-25 19:00 - 20:00", index=2),
+        SlotRow.parse(f"{DATE} 19:00 - 20:00", index=3),
+    ]
+    index = SlotIndex(rows)
+    assert len(index) == 4
+    assert [row.index for row in index.lookup("19:00 - 20:00", DATE)] == [0, 3]
+    assert [row.index for row in index.lookup("19h00 à 21h00", DATE)] == [1]
+    assert index.lookup("20:00 - 21:00", DATE) == []
+    assert index.lookup("n'importe quand", DATE) == []
+
+
+def test_index_lookup_rolls_project_labels_over_midnight():
+    index = SlotIndex([
+        SlotRow.parse("2025-07-25 00:00 - 01:00", index=0),
+        SlotRow.parse(f"{DATE} 23:00 - 00:00", index=1),
+    ])
+    assert [row.index for row in index.lookup("24:00 - 25:00", DATE)] == [0]
+    assert [row.index for row in index.lookup("23:00 - 24:00", DATE)] == [1]
+
+
+def test_matches_come_in_priority_then_row_order():
+    pytest.importorskip("playwright")
+    pytest.importorskip("requests")
+    from fast_scan import match_rows
+
+    rows = [
+        {"index": 0, "quand": f"{DATE} 20:00 - 21:00"},
+        {"index": 1, "quand": f"{DATE} 19:00 - 20:00"},
+        {"index": 2, "quand": f"{DATE} 20:00 - 21:00"},
+        {"index": 3, "quand": f"{DATE} 19h00 à 20h00 (Parc)"},
+    ]
+    matches = [(priority, row["index"]) for priority, _, row in match_rows(rows, ["19:00 - 20:00", "20:00 - 21:00"], DATE)]
+    assert matches == [(1, 1), (1, 3), (2, 0), (2, 2)]
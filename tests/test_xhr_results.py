@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("playwright")
+
+from slot_model import SlotRow  # noqa: E402
+from xhr_results import lines_up, parse_item  # noqa: E402
+
+
+def label(item):
+    row = parse_item(item)
+    return row.label() if row else None
+
+
+def test_utc_timestamps_are_read_in_montreal_time():
+    # 23:00Z in January is 18:00 EST
+    item = {"startDateTime": "2030-01-02T23:00:00Z", "endDateTime": "2030-01-03T00:00:00Z"}
+    assert label(item) == "2030-01-02 18:00 - 19:00"
+    item = {"start": "2030-07-02T23:00:00+00:00", "end": "2030-07-03T00:00:00+00:00"}
+    assert label(item) == "2030-07-02 19:00 - 20:00"
+    item = {"start": "2030-01-02T19:00:00-0500", "end": "2030-01-02T20:00:00-0500"}
+    assert label(item) == "2030-01-02 19:00 - 20:00"
+
+
+def test_keys_are_matched_as_words():
+    item = {
+        "date": "2030-01-02",
+        "from": "19:00",
+        "to": "20:00",
+        "calendar": "21:00",
+        "weekend": "22:00",
+        "website": "https://example.org",
+        "siteName": "Parc B",
+    }
+    row = parse_item(item)
+    assert row.label() == "2030-01-02 19:00 - 20:00"
+    assert row.facility == "Parc B"
+
+
+def test_lines_up_rejects_a_payload_the_table_disagrees_with():
+    parsed = [SlotRow.parse("2030-01-02 18:00 - 19:00", index=0)]
+    assert lines_up(parsed, [{"quand": "2030-01-02 18:00 - 19:00"}])
+    assert not lines_up(parsed, [{"quand": "2030-01-02 23:00 - 24:00"}])
+    assert not lines_up(parsed, [])
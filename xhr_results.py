@@ -0,0 +1,224 @@
+"""
+Search results read from the intercepted search XHR instead of the table.
+
+SCAN_MODE=xhr listens with page.on("response") for the search XHR and parses
+its JSON payload, so each row's date, start/end time and facility come
+straight from the server data and slot matching is an exact field comparison
+instead of a substring check on the rendered 'Quand' text. The DOM is only
+touched to click the matching row's fa-plus button (rows render in response
+order, so item i is table row i of the current page).
+
+Timestamps with a UTC offset or a trailing Z are converted to Montréal time.
+Every page is checked against the rendered table in the same round trip that
+reads the fa-plus buttons: if the parsed rows disagree with the 'Quand'
+column, the table has a match the payload doesn't, or a next-page click
+brings no search response, the caller falls back to the table scan. The
+table is taken back to results page 1 first, so the scan counts first/second
+occurrences from the start.
+
+The body is read lazily from the main flow, never inside the event handler.
+"""
+import re
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from claim_ledger import ClaimPicker
+from fast_scan import add_to_cart, bookable, extract_rows, match_rows
+from http_probe import _result_items
+from readiness import click_and_wait_for_table, is_search_response
+from slot_model import SlotIndex, SlotRow, parse_range
+
+MTL = ZoneInfo("America/Toronto")
+
+_DATETIME = re.compile(r"(\d{4}-\d{2}-\d{2})[T ](\d{1,2}:\d{2})(?::\d{2}(?:\.\d+)?)?\s*(Z|[+-]\d{2}:?\d{2})?")
+_TIME = re.compile(r"^(\d{1,2}):(\d{2})")
+_WORD = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+_listeners = {}  # page -> SearchResponseListener
+
+
+def _hhmm(text):
+    m = _TIME.match(text)
+    return f"{int(m.group(1)):02d}:{m.group(2)}" if m else None
+
+
+def _local(m):
+    """(date, 'HH:MM') of a _DATETIME match, in Montréal time if it carries an offset."""
+    date, hhmm, offset = m.group(1), _hhmm(m.group(2)), m.group(3)
+    if not offset:
+        return date, hhmm
+    if offset == "Z":
+        offset = "+00:00"
+    elif ":" not in offset:
+        offset = f"{offset[:3]}:{offset[3:]}"
+    moment = datetime.fromisoformat(f"{date}T{hhmm}{offset}").astimezone(MTL)
+    return moment.strftime("%Y-%m-%d"), moment.strftime("%H:%M")
+
+
+def _words(key):
+    """'startDateTime' -> {'start', 'date', 'time'}; 'weekend' stays {'weekend'}."""
+    return {word.lower() for word in _WORD.findall(key)}
+
+
+def parse_item(item, index=None):
+    """
+    Pull date, start, end and facility out of one search result item.
+    Returns a SlotRow, or None if the item has no recognisable date/time.
+    """
+    date = start = end = facility = None
+    for key, value in item.items():
+        if not isinstance(value, str):
+            continue
+        words = _words(key)
+        m = _DATETIME.search(value)
+        if words & {"start", "begin", "from"}:
+            if m:
+                date, start = _local(m)
+            elif _hhmm(value):
+                start = _hhmm(value)
+        elif words & {"end", "to", "until"}:
+            if m:
+                end = _local(m)[1]
+            elif _hhmm(value):
+                end = _hhmm(value)
+        elif facility is None and words & {"facility", "site", "location", "venue", "lieu"}:
+            facility = value
+        if date is None and "date" in words and m is None and re.match(r"^\d{4}-\d{2}-\d{2}", value):
+            date = value[:10]
+
+    if start is None or end is None or date is None:
+        # No explicit fields: fall back to the first two datetimes in the item
+        found = [_local(m) for v in item.values() if isinstance(v, str) for m in _DATETIME.finditer(v)]
+        if len(found) >= 2:
+            date = date or found[0][0]
+            start = start or found[0][1]
+            end = end or found[1][1]
+    if date is None or start is None or end is None:
+        return None
+    start_minute, end_minute = parse_range(f"{start} - {end}")
+    return SlotRow(date, start_minute, end_minute, facility, index)
+
+
+class SearchResponseListener:
+    def __init__(self):
+        self.response = None
+        self.version = 0
+        self._parsed_version = None
+        self._rows = None
+
+    def _on_response(self, response):
+        if is_search_response(response):
+            self.response = response
+            self.version += 1
+
+    def rows(self):
+        """Parsed rows of the latest search response, or None if it isn't usable."""
+        if self.response is None:
+            return None
+        if self._parsed_version != self.version:
+            self._parsed_version = self.version
+            try:
+                items = _result_items(self.response.json())
+            except Exception as e:
+                print(f"⚠️ [XHR] Could not read search response: {e}")
+                items = []
+            parsed = [parse_item(item, i) for i, item in enumerate(items)]
+            self._rows = parsed if parsed and all(parsed) else None
+        return self._rows
+
+
+def install_response_listener(page):
+    listener = SearchResponseListener()
+    page.on("response", listener._on_response)
+    _listeners[page] = listener
+    return listener
+
+
+def match_parsed_rows(rows, priority_slots, target_date):
+    """Exact-field version of fast_scan.match_rows: yields (priority, slot, SlotRow)."""
+    index = SlotIndex(rows)
+    for priority, slot in enumerate(priority_slots, 1):
+        for row in index.lookup(slot, target_date):
+            yield priority, slot, row
+
+
+def lines_up(rows, table_rows):
+    """True if every parsed row says the same date and time as its rendered 'Quand' cell."""
+    if len(rows) != len(table_rows):
+        return False
+    for row, table_row in zip(rows, table_rows):
+        rendered = SlotRow.parse(table_row["quand"])
+        if rendered is not None and (rendered.date, rendered.start, rendered.end) != (row.date, row.start, row.end):
+            return False
+    return True
+
+
+def _fall_back(page, moved):
+    """(False, None) for the table scan, back on results page 1 if the scan had moved past it."""
+    if moved:
+        print("[XHR] Back to results page 1 for the table scan...")
+        link = page.locator("ul.pagination li a", has_text=re.compile(r"^\s*1\s*$"))
+        if link.count() == 0 or not click_and_wait_for_table(page, link.first, "results page 1"):
+            print("⚠️ [XHR] Couldn't get back to results page 1, the table scan starts mid-way.")
+    return False, None
+
+
+def try_find_slot_xhr(page, priority_slots, target_date, prefer_second=False, timeout=5000, ledger=None, account=None):
+    """
+    try_find_slot driven by the search XHR payload. Pagination clicks
+    li.pagination-next and waits for the next search response.
+
+    Returns (handled, slot). handled is False when the payload can't be used
+    (unparsable, its rows don't line up with the table, or it misses a match
+    the table has) and the caller should scan the table instead.
+    """
+    print("[SCAN] Matching priority slots against the search response...")
+    listener = _listeners.get(page)
+    matched = 0
+    picker = ClaimPicker(prefer_second, ledger, account)
+    page_no = 1
+
+    while True:
+        rows = listener.rows() if listener else None
+        if rows is None:
+            print("⚠️ [XHR] Search response has no parsable rows.")
+            return _fall_back(page, page_no > 1)
+        # One evaluate for the buttons, the pagination state and the cross-check
+        table = extract_rows(page)
+        if table is None or not lines_up(rows, table["rows"]):
+            print("⚠️ [XHR] Search response doesn't line up with the result table.")
+            return _fall_back(page, page_no > 1)
+
+        page_matches = 0
+        for priority, slot, row in match_parsed_rows(rows, priority_slots, target_date):
+            if not table["rows"][row.index]["hasButton"]:
+                continue
+            matched += 1
+            page_matches += 1
+            print(f"🔍 Found match #{matched}: [{target_date}] '{slot}' at row {row.index+1} ({row.facility or '?'})")
+            if picker.take(target_date, slot, row.facility):
+                print(f"✅ [P{priority}] Booking '{slot}'")
+                add_to_cart(page, row.index)
+                return True, slot
+        if page_matches == 0 and next(match_rows(bookable(table["rows"]), priority_slots, target_date), None):
+            print("⚠️ [XHR] The table has a match the search response doesn't.")
+            return _fall_back(page, page_no > 1)
+
+        if not (table["hasPagination"] and table["hasNext"]):
+            break
+        print("➡️ Moving to next page...")
+        next_li = page.locator("li.pagination-next")
+        try:
+            with page.expect_response(is_search_response, timeout=timeout):
+                next_li.locator("a.ng-binding", has_text=">").click()
+        except PlaywrightTimeoutError:
+            print("⚠️ [XHR] Next page brought no search response.")
+            # The table may have moved on without one
+            current = extract_rows(page)
+            return _fall_back(page, page_no > 1 or current is None or current["rows"] != table["rows"])
+        page_no += 1
+
+    print("⛔ Not enough matches in the search response.")
+    return True, None